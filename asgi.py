@@ -0,0 +1,184 @@
+"""
+سرور async (ASGI) - همان routeهای app.py با کلاینت‌های async
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+
+منطق پردازش همان flowهای core است (core.flow.arun)؛ هر رویداد یک task روی
+event loop است، پس یک پروسه صدها webhook منتظر ClickUp/Telegram را هم‌زمان
+نگه می‌دارد بدون اینکه worker یا thread اشغال شود.
+"""
+
+import asyncio
+from urllib.parse import parse_qs
+
+from core.settings import TEAMS, NOTIFICATIONS, GENERAL, TEST_KEY
+from core import pipeline
+from core.flow import arun
+from core.delivery import AsyncDeliveryQueue
+from core.clients import aclose_clients
+from core.metrics import CONTENT_TYPE
+from core.body import RequestBody
+from core import codec
+
+CORS_ORIGINS = {"https://app.clickup.com", "https://api.clickup.com"}
+# مثل پیش‌فرض Flask-CORS: همه متدها و هر هدری که preflight بخواهد
+CORS_METHODS = b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+
+
+# ─────────────────────────────────────────────────────────────────
+#  HTTP
+# ─────────────────────────────────────────────────────────────────
+
+class Request:
+    def __init__(self, scope, receive):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+        self.args = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.receive = receive
+
+    async def body(self, body=None):
+        """خواندن بدنه (یک بار، تکه به تکه) در RequestBody با سقف MAX_BODY_BYTES"""
+        body = body or RequestBody()
+        while True:
+            message = await self.receive()
+            if not body.feed(message.get("body", b"")) or not message.get("more_body"):
+                return body
+
+
+def jsonify(body, status=200):
+    # مثل jsonify در Flask: کلیدهای مرتب، فشرده، با newline
+    return status, codec.dumps(body, sort_keys=True) + b"\n"
+
+
+async def respond(send, request, status, payload, content_type=b"application/json", extra=()):
+    headers = [(b"content-type", content_type), (b"content-length", str(len(payload)).encode()), *extra]
+    origin = request.headers.get("origin")
+    if origin in CORS_ORIGINS:
+        headers += [(b"access-control-allow-origin", origin.encode()), (b"vary", b"Origin")]
+        if request.method == "OPTIONS" and "access-control-request-method" in request.headers:
+            headers.append((b"access-control-allow-methods", CORS_METHODS))
+            wanted = request.headers.get("access-control-request-headers")
+            if wanted:
+                allowed = sorted({h.strip() for h in wanted.split(",") if h.strip()})
+                headers.append((b"access-control-allow-headers", ", ".join(allowed).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    # HEAD: همان هدرها (و content-length) بدون بدنه
+    await send({"type": "http.response.body", "body": b"" if request.method == "HEAD" else payload})
+
+
+def allowed_methods(methods):
+    """مثل Flask: HEAD برای هر مسیر GET و OPTIONS برای همه"""
+    allow = {*methods, "OPTIONS"} | ({"HEAD"} if "GET" in methods else set())
+    return [(b"allow", ", ".join(sorted(allow)).encode())]
+
+
+# ─────────────────────────────────────────────────────────────────
+#  Routes
+# ─────────────────────────────────────────────────────────────────
+
+async def home(request):
+    return jsonify({
+        "status": "running",
+        "service": "ClickUp Team Updater Bot",
+        "teams": list(TEAMS.keys())
+    })
+
+async def health(request):
+    return jsonify({"status": "healthy"})
+
+async def metrics(request):
+    return 200, pipeline.metrics().encode(), CONTENT_TYPE.encode()
+
+async def show_config(request):
+    if request.args.get('key') != TEST_KEY:
+        return jsonify({"error": "Forbidden"}, 403)
+    return jsonify({
+        "teams": {k: {"name": v["name"], "enabled": v["enabled"]} for k, v in TEAMS.items()},
+        "notifications": NOTIFICATIONS,
+        "general": GENERAL
+    })
+
+async def stats(request):
+    if request.args.get('key') != TEST_KEY:
+        return jsonify({"error": "Forbidden"}, 403)
+    return jsonify(pipeline.stats())
+
+async def webhook(request):
+    # فقط فیلتر، حذف تکراری و صف‌بندی - پردازش در task جداگانه (AsyncDeliveryQueue)
+    body = await request.body(pipeline.webhook_body())
+    status, result = pipeline.receive_clickup_webhook(body, request.headers.get("x-signature"))
+    return jsonify(result, status)
+
+async def telegram_webhook(request):
+    status, result = await arun(pipeline.receive_telegram_update.flow(await request.body()))
+    return jsonify(result, status)
+
+async def test(request):
+    if request.args.get('key') != TEST_KEY:
+        return jsonify({"error": "Forbidden"}, 403)
+    active_teams = await arun(pipeline.send_test_message.flow())
+    return jsonify({"status": "ok", "active_teams": active_teams})
+
+
+ROUTES = {
+    "/": {"GET": home},
+    "/health": {"GET": health},
+    "/metrics": {"GET": metrics},
+    "/config": {"GET": show_config},
+    "/stats": {"GET": stats},
+    "/webhook": {"POST": webhook},
+    "/telegram": {"POST": telegram_webhook},
+    "/test": {"GET": test},
+}
+
+
+# ─────────────────────────────────────────────────────────────────
+#  ASGI
+# ─────────────────────────────────────────────────────────────────
+
+def _use_async_delivery():
+    if not isinstance(pipeline.delivery, AsyncDeliveryQueue):
+        pipeline.use_delivery(AsyncDeliveryQueue(asyncio.get_running_loop()))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            _use_async_delivery()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # پنجره ادغام و خلاصه‌ها → کارهای باز → commit نهایی فایل‌ها
+            pipeline.flush_buffers()
+            await pipeline.delivery.drain()
+            pipeline.close_stores()
+            await aclose_clients()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    _use_async_delivery()
+
+    request = Request(scope, receive)
+    methods = ROUTES.get(request.path)
+    if methods is None:
+        return await respond(send, request, 404, b"Not Found", b"text/plain")
+    if request.method == "OPTIONS":
+        # مثل OPTIONS خودکار Flask: هدر Allow با متدهای همین مسیر
+        return await respond(send, request, 200, b"", b"text/html; charset=utf-8", allowed_methods(methods))
+    handler = methods.get("GET" if request.method == "HEAD" else request.method)
+    if handler is None:
+        return await respond(send, request, 405, b"Method Not Allowed", b"text/plain", allowed_methods(methods))
+
+    try:
+        status, payload, *content_type = await handler(request)
+    except Exception as e:
+        print(f"Error: {e}")
+        return await respond(send, request, 500, b"Internal Server Error", b"text/plain")
+    await respond(send, request, status, payload, *content_type)
@@ -0,0 +1,276 @@
+"""
+بنچمارک سرتاسری آفلاین: سرور واقعی (Flask/gunicorn یا ASGI/uvicorn) + ClickUp و
+Telegram جایگزین محلی (bench/fakes.py)
+
+    python bench/e2e.py                          # مقایسه با bench/baseline.json
+    python bench/e2e.py --server asgi --events 1000 --concurrency 64
+    python bench/e2e.py --latency-ms 200 --error-rate 0.05 --rate-limit-rate 0.02
+    python bench/e2e.py --save-baseline          # ثبت نتیجه فعلی به عنوان مبنا
+
+گزارش: p50/p95/p99 زمان پاسخ /webhook و /telegram، زمان سرتاسری (اولین webhook
+یک تسک → رسیدن پیام آن به تلگرام)، رویداد در ثانیه و تعداد درخواست upstream به
+ازای هر رویداد. اگر نتیجه از مبنا (با تلورانس) بدتر باشد exit code غیر صفر است.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fakes import Knobs, FakeClickUp, FakeTelegram, comment_event, status_event, automation_event, callback_update
+
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+# معیار → (بهتر بودن: کمتر / بیشتر، تلورانس نسبی)
+CHECKS = {
+    "webhook_p95_ms": ("lower", 0.5),
+    "e2e_p95_ms": ("lower", 0.3),
+    "callback_p95_ms": ("lower", 0.5),
+    "events_per_sec": ("higher", 0.25),
+    "upstream_calls_per_event": ("lower", 0.05),
+    "upstream_calls_per_callback": ("lower", 0.05),
+}
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summary(name, values_ms):
+    return {f"{name}_p50_ms": round(percentile(values_ms, 50), 1),
+            f"{name}_p95_ms": round(percentile(values_ms, 95), 1),
+            f"{name}_p99_ms": round(percentile(values_ms, 99), 1)}
+
+
+# ─────────────────────────────────────────────────────────────────
+#  سرور تحت آزمون
+# ─────────────────────────────────────────────────────────────────
+
+def start_server(mode, port, clickup, telegram, workdir):
+    env = {
+        **os.environ,
+        "TELEGRAM_API_BASE": telegram.url,
+        "CLICKUP_API_BASE": clickup.url,
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "CLICKUP_API_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "918656204",
+        "WEBHOOK_SECRET": "",
+        "OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+        "TG_FILE_ID_DB": os.path.join(workdir, "file_ids.db"),
+        "REPORT_DB": "",
+        # محدودیت‌های تلگرام جدا سنجیده می‌شوند؛ اینجا خود سرویس اندازه گرفته می‌شود
+        "TG_GLOBAL_RATE": os.getenv("TG_GLOBAL_RATE", "100000"),
+        "TG_CHAT_RATE": os.getenv("TG_CHAT_RATE", "100000"),
+        "TG_GROUP_RATE_PER_MIN": os.getenv("TG_GROUP_RATE_PER_MIN", "6000000"),
+        "TG_CHAT_BURST": os.getenv("TG_CHAT_BURST", "100000"),
+        # سهمیه ClickUp فقط با --clickup-limit (هدرهای X-RateLimit-* جایگزین) فعال است
+        "CLICKUP_RATE_PER_MIN": os.getenv("CLICKUP_RATE_PER_MIN", "6000000"),
+        "CLICKUP_BURST": os.getenv("CLICKUP_BURST", "100000"),
+    }
+    if mode == "asgi":
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "--threads", "16", "-b", f"127.0.0.1:{port}",
+               "--log-level", "warning", "app:app"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+
+async def wait_healthy(client, proc, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not become healthy")
+
+
+# ─────────────────────────────────────────────────────────────────
+#  بار
+# ─────────────────────────────────────────────────────────────────
+
+def build_workload(events, burst, seed=1):
+    """رویدادهای واقعی: کامنت (با و بدون عکس)، تغییر وضعیت، automation؛ burst رویداد برای هر تسک"""
+    rnd = random.Random(seed)
+    workload = []
+    for i in range(max(1, events // burst)):
+        task_id = f"bench{i}"
+        for seq in range(burst):
+            pick = rnd.random()
+            if pick < 0.45:
+                workload.append((task_id, comment_event(task_id, seq, images=rnd.choice((0, 0, 1, 3)))))
+            elif pick < 0.8:
+                workload.append((task_id, status_event(task_id, seq)))
+            else:
+                workload.append((task_id, automation_event(task_id, seq)))
+    return workload
+
+
+async def drive(client, path, bodies, concurrency):
+    """ارسال هم‌زمان با حداکثر concurrency درخواست باز → (زمان‌های پاسخ ms، زمان ارسال هر بدنه، خطاها)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, started, errors = [], {}, 0
+
+    async def one(key, body):
+        nonlocal errors
+        async with semaphore:
+            start = time.monotonic()
+            started.setdefault(key, start)
+            response = await client.post(path, json=body)
+            latencies.append((time.monotonic() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    await asyncio.gather(*(one(key, body) for key, body in bodies))
+    return latencies, started, errors
+
+
+async def wait_delivered(telegram, task_ids, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and not task_ids <= telegram.delivered.keys():
+        await asyncio.sleep(0.05)
+
+
+async def run(args):
+    import httpx
+    knobs = Knobs(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate,
+                  clickup_limit=args.clickup_limit, window=args.clickup_window)
+    clickup, telegram = FakeClickUp(knobs), FakeTelegram(knobs)
+    port = args.port or random.randint(20000, 40000)
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = start_server(args.server, port, clickup, telegram, workdir)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60, limits=limits) as client:
+                await wait_healthy(client, proc)
+
+                # ۱. webhookهای ClickUp
+                workload = build_workload(args.events, args.burst)
+                start = time.monotonic()
+                webhook_ms, first_sent, webhook_errors = await drive(client, "/webhook", workload, args.concurrency)
+                await wait_delivered(telegram, set(first_sent), args.drain_timeout)
+                elapsed = max(telegram.delivered.values(), default=time.monotonic()) - start
+                await asyncio.sleep(0.5)
+                event_calls = clickup.total_calls() + telegram.total_calls()
+                e2e_ms = [(telegram.delivered[t] - s) * 1000 for t, s in first_sent.items() if t in telegram.delivered]
+
+                # ۲. دکمه‌های تلگرام
+                callbacks = [(i, callback_update(i)) for i in range(1, args.callbacks + 1)]
+                callback_ms, _, callback_errors = await drive(client, "/telegram", callbacks, args.concurrency)
+                await asyncio.sleep(0.5 + args.latency_ms / 1000 * 2)
+                callback_calls = clickup.total_calls() + telegram.total_calls() - event_calls
+        finally:
+            proc.terminate()
+            proc.wait(30)
+            clickup.close()
+            telegram.close()
+
+    delivered = sum(1 for t in first_sent if t in telegram.delivered)
+    return {
+        "server": args.server,
+        "events": len(workload),
+        "tasks": len(first_sent),
+        "delivered_tasks": delivered,
+        "errors": webhook_errors + callback_errors,
+        **summary("webhook", webhook_ms),
+        **summary("e2e", e2e_ms),
+        **summary("callback", callback_ms),
+        "events_per_sec": round(len(workload) / elapsed, 1) if elapsed > 0 else 0.0,
+        "upstream_calls_per_event": round(event_calls / len(workload), 3),
+        "upstream_calls_per_callback": round(callback_calls / max(1, len(callbacks)), 3),
+        "clickup_rejected": clickup.rejected,
+        "upstream_calls": {**{f"clickup {k}": v for k, v in clickup.calls.items()},
+                           **{f"telegram {k}": v for k, v in telegram.calls.items()}},
+    }
+
+
+# ─────────────────────────────────────────────────────────────────
+#  مبنا
+# ─────────────────────────────────────────────────────────────────
+
+def compare(result, baseline, scale=1.0):
+    failures = []
+    for metric, (better, tolerance) in CHECKS.items():
+        if metric not in baseline:
+            continue
+        base, value = baseline[metric], result[metric]
+        tolerance *= scale
+        if better == "lower" and value > base * (1 + tolerance) + 1e-9:
+            failures.append(f"{metric}: {value} > {base} (+{tolerance:.0%})")
+        if better == "higher" and value < base * (1 - tolerance) - 1e-9:
+            failures.append(f"{metric}: {value} < {base} (-{tolerance:.0%})")
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("flask", "asgi"), default="flask")
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--burst", type=int, default=2, help="رویداد پشت سر هم برای هر تسک")
+    parser.add_argument("--callbacks", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--clickup-limit", type=int, default=0, help="سهمیه ClickUp در هر پنجره (0 = بدون سهمیه)")
+    parser.add_argument("--clickup-window", type=float, default=60)
+    parser.add_argument("--drain-timeout", type=float, default=120)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance-scale", type=float, default=1.0, help="ضریب تلورانس‌ها (مثلا 2 برای CI شلوغ)")
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    # مبنا فقط برای تنظیمات پیش‌فرض معنی دارد؛ هر ترکیب knob کلید جدا دارد
+    key = f"{args.server}:{args.events}x{args.burst}:c{args.concurrency}:l{args.latency_ms:g}" \
+          f":e{args.error_rate:g}:r{args.rate_limit_rate:g}"
+    if args.clickup_limit:
+        key += f":q{args.clickup_limit}/{args.clickup_window:g}"
+
+    if args.save_baseline:
+        baselines[key] = {k: v for k, v in result.items() if k in CHECKS}
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved: {key}")
+        return 0
+
+    if result["delivered_tasks"] < result["tasks"]:
+        print(f"FAIL: only {result['delivered_tasks']}/{result['tasks']} tasks delivered")
+        return 1
+    if key not in baselines:
+        print(f"no baseline for {key} (use --save-baseline)")
+        return 0
+    failures = compare(result, baselines[key], args.tolerance_scale)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    print("OK" if not failures else "FAIL")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,212 @@
+"""
+سرورهای جایگزین محلی برای api.clickup.com و api.telegram.org (فقط برای بنچمارک)
+
+تاخیر، نرخ خطای 5xx و نرخ 429 قابل تنظیم است. هر فراخوانی با زمان دریافت ثبت
+می‌شود تا زمان سرتاسری (webhook → پیام تلگرام) از روی لینک تسک در متن پیام
+محاسبه شود.
+"""
+
+import re
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+_TASK_LINK = re.compile(r"/t/([\w-]+)")
+
+
+class Knobs:
+    """clickup_limit: سهمیه ClickUp در هر پنجره window ثانیه (با هدرهای X-RateLimit-*)؛ 0 = بدون سهمیه"""
+
+    def __init__(self, latency_ms=50, jitter_ms=10, error_rate=0.0, rate_limit_rate=0.0, retry_after=1,
+                 clickup_limit=0, window=60):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.clickup_limit = clickup_limit
+        self.window = window
+
+    def delay(self):
+        time.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class FakeUpstream:
+    """پایه مشترک: شمارش فراخوانی‌ها به تفکیک متد و اجرای سرور در thread"""
+
+    def __init__(self, knobs):
+        self.knobs = knobs
+        self.calls = {}
+        self.delivered = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply(*fake.handle("GET", self.path, None))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                self._reply(*fake.handle("POST", self.path, body))
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def count(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def close(self):
+        self.server.shutdown()
+
+
+class FakeClickUp(FakeUpstream):
+    """GET task و GET comment با کامنت‌های دارای عکس"""
+
+    def __init__(self, knobs):
+        super().__init__(knobs)
+        self._window = (time.time(), 0)
+        self.rejected = 0
+
+    def _quota(self):
+        """هدرهای X-RateLimit-* و اینکه سهمیه پنجره تمام شده یا نه"""
+        if not self.knobs.clickup_limit:
+            return {}, False
+        with self._lock:
+            start, used = self._window
+            if time.time() >= start + self.knobs.window:
+                start, used = time.time(), 0
+            used += 1
+            self._window = (start, used)
+            self.rejected += used > self.knobs.clickup_limit
+        remaining = max(0, self.knobs.clickup_limit - used)
+        headers = {"X-RateLimit-Limit": str(self.knobs.clickup_limit), "X-RateLimit-Remaining": str(remaining),
+                   "X-RateLimit-Reset": str(int(start + self.knobs.window))}
+        return headers, used > self.knobs.clickup_limit
+
+    def handle(self, verb, path, body):
+        match = re.match(r"/api/v2/task/([\w-]+)(/comment)?", path.split("?")[0])
+        name = "GET comment" if match and match.group(2) else "GET task"
+        self.count(name)
+        self.knobs.delay()
+        headers, exhausted = self._quota()
+        if exhausted:
+            return 429, {"err": "Rate limit reached", "ECODE": "APP_002"}, headers
+        if random.random() < self.knobs.error_rate:
+            return 500, {"err": "fake error"}
+        if random.random() < self.knobs.rate_limit_rate:
+            return 429, {"err": "Rate limit reached"}
+        task_id = match.group(1) if match else "x"
+        if match and match.group(2):
+            return 200, {"comments": [comment_body(task_id, images=2)]}, headers
+        return 200, task_body(task_id), headers
+
+
+class FakeTelegram(FakeUpstream):
+    """Bot API با پاسخ‌های هم‌شکل تلگرام (sendMediaGroup → پیام‌ها با file_id)"""
+
+    def __init__(self, knobs):
+        super().__init__(knobs)
+        self._message_id = 0
+
+    def handle(self, verb, path, body):
+        method = path.rsplit("/", 1)[-1]
+        self.count(method)
+        self.knobs.delay()
+        if random.random() < self.knobs.error_rate:
+            return 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+        if method != "answerCallbackQuery" and random.random() < self.knobs.rate_limit_rate:
+            return 429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                         "parameters": {"retry_after": self.knobs.retry_after}}
+        text = body.get("text") or body.get("caption") or \
+            next((m.get("caption") for m in body.get("media") or [] if m.get("caption")), "") or ""
+        link = _TASK_LINK.search(text)
+        if link:
+            with self._lock:
+                self.delivered.setdefault(link.group(1), time.monotonic())
+        chat = {"id": body.get("chat_id", 1)}
+        with self._lock:
+            self._message_id += 1
+            message_id = self._message_id
+        if method == "sendMediaGroup":
+            return 200, {"ok": True, "result": [
+                {"message_id": message_id, "chat": chat, "media_group_id": f"g{message_id}",
+                 "photo": [{"file_id": f"file{message_id}_{i}"}]} for i, _ in enumerate(body["media"])]}
+        message = {"message_id": message_id, "chat": chat}
+        if method == "sendPhoto":
+            message["photo"] = [{"file_id": f"file{message_id}"}]
+        return 200, {"ok": True, "result": message}
+
+
+# ─────────────────────────────────────────────────────────────────
+#  payloadهای نمونه
+# ─────────────────────────────────────────────────────────────────
+
+def task_body(task_id):
+    return {
+        "id": task_id,
+        "name": f"Task {task_id}",
+        "custom_fields": [{
+            "id": "fld-requestor",
+            "name": "Requestor",
+            "value": 0,
+            "type_config": {"options": [{"id": "opt-facility", "name": "Facility & Partnership", "orderindex": 0}]},
+        }],
+    }
+
+
+def comment_body(task_id, images=0, text="لطفا بررسی شود"):
+    parts = [{"type": "text", "text": text}]
+    parts += [{"type": "image", "image": {"id": f"att-{task_id}-{i}", "url": f"https://example.com/{task_id}/{i}.png"}}
+              for i in range(images)]
+    return {"id": f"c-{task_id}", "comment": parts, "comment_text": text,
+            "user": {"username": "bench"}, "date": str(int(time.time() * 1000))}
+
+
+def comment_event(task_id, seq, images=0):
+    return {"event": "taskCommentPosted", "task_id": task_id, "webhook_id": "bench",
+            "history_items": [{"id": f"h-{task_id}-{seq}", "field": "comment", "user": {"username": "bench"},
+                               "comment": comment_body(task_id, images)}]}
+
+
+def status_event(task_id, seq, after="in progress"):
+    return {"event": "taskStatusUpdated", "task_id": task_id, "webhook_id": "bench",
+            "history_items": [{"id": f"h-{task_id}-{seq}", "field": "status", "user": {"username": "bench"},
+                               "before": {"status": "open"}, "after": {"status": after}}]}
+
+
+def automation_event(task_id, seq):
+    return {"payload": {"id": task_id, "name": f"Task {task_id}"}, "auto_id": "bench", "trigger_id": f"t-{task_id}-{seq}"}
+
+
+def callback_update(update_id, team_key="facility"):
+    return {"update_id": update_id, "callback_query": {
+        "id": f"cb{update_id}", "data": f"send:{team_key}",
+        "message": {"chat": {"id": 918656204}, "message_id": update_id, "text": f"پیام {update_id}"}}}
@@ -0,0 +1,67 @@
+"""
+بنچمارک زمان import در cold start سرورلس
+
+هر مورد N بار در یک مفسر تازه import می‌شود و زمان import داخل همان پروسه با
+perf_counter اندازه گرفته می‌شود (راه‌اندازی مفسر حساب نمی‌شود)؛ کمینه اجراها
+گزارش می‌شود چون نویز فقط زمان را بیشتر می‌کند. اگر از بودجه بیشتر شد exit code
+غیر صفر است (برای CI).
+
+    python bench/import_time.py [runs]
+
+IMPORT_BUDGET_MS  : بودجه import ماژول handler - مسیر GET (پیش‌فرض 30)
+PIPELINE_BUDGET_MS: بودجه import کامل core.pipeline بدون httpx (پیش‌فرض 100)
+CLIENT_BUDGET_MS  : بودجه اولین درخواست خروجی = pipeline + ساخت کلاینت httpx (پیش‌فرض 600)
+"""
+
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 30))
+PIPELINE_BUDGET_MS = float(os.getenv("PIPELINE_BUDGET_MS", 100))
+CLIENT_BUDGET_MS = float(os.getenv("CLIENT_BUDGET_MS", 600))
+
+_LOAD_HANDLER = (
+    "import importlib.util as u;"
+    "s=u.spec_from_file_location('webhook', 'api/webhook.py');"
+    "m=u.module_from_spec(s);s.loader.exec_module(m)"
+)
+
+CASES = {
+    "handler": _LOAD_HANDLER,
+    "pipeline": _LOAD_HANDLER + ";import core.pipeline",
+    "client": _LOAD_HANDLER + ";import core.pipeline;from core.clients import get_client, TELEGRAM_API_BASE;"
+              "get_client(TELEGRAM_API_BASE)",
+}
+
+
+_TIMED = "import time;_t=time.perf_counter();{};print((time.perf_counter()-_t)*1000)"
+
+
+def measure(code, runs):
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _TIMED.format(code)], cwd=ROOT, check=True,
+                             capture_output=True, text=True, env={**os.environ, "OUTBOX_PATH": ""})
+        times.append(float(out.stdout.split()[-1]))
+    return min(times)
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 15
+    results = {name: measure(code, runs) for name, code in CASES.items()}
+    
+    failed = False
+    budgets = (("handler", IMPORT_BUDGET_MS), ("pipeline", PIPELINE_BUDGET_MS), ("client", CLIENT_BUDGET_MS))
+    for name, budget in budgets:
+        cost = results[name]
+        ok = cost <= budget
+        failed |= not ok
+        print(f"{name:10} {cost:8.1f} ms  (budget {budget:.0f} ms)  {'OK' if ok else 'OVER'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
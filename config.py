@@ -82,6 +82,14 @@ TEAMS = {
     #     "name": "Team Display Name",     # نام نمایشی
     #     "emoji": "🔹",                   # ایموجی
     #     "enabled": True,                 # فعال/غیرفعال
+    #     "notifications": {               # (اختیاری) جایگزین NOTIFICATIONS برای تسک‌های این تیم
+    #         "status_changed": False,
+    #     },
+    #     "digest": {                      # (اختیاری) ارسال پیام‌های تایید شده به شکل خلاصه
+    #         "enabled": True,
+    #         "interval_minutes": 30,      # هر ۳۰ دقیقه یک پیام ترکیبی
+    #         "max_items": 20,             # یا زودتر، بعد از ۲۰ پیام
+    #     },
     # },
     
 }
@@ -104,7 +112,7 @@ NOTIFICATIONS = {
     # تغییر وضعیت تسک
     "status_changed": True,          # 📊 تغییر وضعیت (Open → In Progress → Done)
     
-    # تسک تکمیل شد
+    # تسک تکمیل شد (خاموش → با status_changed به شکل تغییر وضعیت معمولی)
     "task_completed": True,          # ✅ تسک تکمیل شد
     
     # تسک جدید ایجاد شد
@@ -119,6 +127,9 @@ NOTIFICATIONS = {
     # تغییر assignee
     "assignee_changed": False,       # 👤 تغییر مسئول
     
+    # سایر تغییرات تسک (نام، تگ، جابجایی، ...)
+    "other_activity": True,          # 🔔 فعالیت جدید
+    
 }
 
 
@@ -0,0 +1,11 @@
+"""
+هسته مشترک بات ClickUp → Telegram
+
+مسیر هر رویداد: parse (events) → دریافت اطلاعات (enrichment, clickup) →
+تشخیص تیم (routing) → ساخت پیام (render) → ارسال (telegram, delivery)
+
+app.py (Flask)، asgi.py و api/webhook.py (Vercel) فقط adapter هستند و همه منطق در
+core.pipeline است. توابعی که I/O دارند flow هستند (core.flow) و با کلاینت sync یا
+async اجرا می‌شوند. ماژول‌های سنگین مثل httpx فقط در اولین استفاده import
+می‌شوند تا cold start سرورلس کوتاه بماند.
+"""
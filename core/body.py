@@ -0,0 +1,70 @@
+"""
+خواندن بدنه خام درخواست در یک مرحله
+
+adapterها تکه‌های بدنه را همان‌طور که از سوکت می‌رسند به feed می‌دهند: اندازه با
+MAX_BODY_BYTES کنترل و HMAC هم‌زمان محاسبه می‌شود، پس بدنه فقط یک بار خوانده،
+یک بار hash و (در core.pipeline) یک بار decode می‌شود.
+"""
+
+import os
+import hmac
+import hashlib
+
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", 1024 * 1024))
+
+
+class RequestBody:
+    """بدنه درخواست با سقف اندازه و HMAC-SHA256 تدریجی (اگر secret داده شود)"""
+
+    def __init__(self, secret=None, max_bytes=MAX_BODY_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.too_large = False
+        self._chunks = []
+        self._raw = None
+        self._secret = secret
+        self._mac = hmac.new(secret.encode(), digestmod=hashlib.sha256) if secret else None
+
+    @classmethod
+    def of(cls, data, secret=None, max_bytes=MAX_BODY_BYTES):
+        body = cls(secret, max_bytes)
+        body.feed(data or b"")
+        return body
+
+    def feed(self, chunk):
+        """افزودن یک تکه؛ بعد از گذشتن از سقف بقیه دور ریخته می‌شود - False یعنی ادامه نده"""
+        if self.too_large:
+            return False
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.too_large = True
+            self._chunks = []
+            return False
+        if chunk:
+            if self._mac is not None:
+                self._mac.update(chunk)
+            self._chunks.append(chunk)
+            self._raw = None
+        return True
+
+    def read_from(self, read):
+        """خواندن از یک stream (مثل request.stream در Flask) تا پایان یا سقف - معمولا با یک read"""
+        while True:
+            chunk = read(self.max_bytes + 1 - self.size)
+            if not chunk or not self.feed(chunk):
+                return self
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = self._chunks[0] if len(self._chunks) == 1 else b"".join(self._chunks)
+            self._chunks = [self._raw] if self._raw else []
+        return self._raw
+
+    def hexdigest(self, secret):
+        """HMAC-SHA256 بدنه؛ اگر هنگام خواندن با همین secret محاسبه شده دوباره hash نمی‌شود"""
+        if self._mac is not None and self._secret == secret:
+            return self._mac.hexdigest()
+        return hmac.new(secret.encode(), self.raw, hashlib.sha256).hexdigest()
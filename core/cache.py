@@ -0,0 +1,114 @@
+"""
+کش LRU با TTL برای اطلاعات تسک‌های ClickUp
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+
+TASK_CACHE_SIZE = int(os.getenv("TASK_CACHE_SIZE", 512))
+TASK_CACHE_TTL = float(os.getenv("TASK_CACHE_TTL", 300))
+
+
+class TTLCache:
+    """کش محدود؛ قدیمی‌ترین آیتم هنگام پر شدن و آیتم منقضی هنگام خواندن حذف می‌شود"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """مقدار کش شده یا None"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def add(self, key, value=True):
+        """ثبت فقط اگر کلید (معتبر) وجود نداشته باشد - True یعنی کلید جدید بود"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] >= time.monotonic():
+                self.hits += 1
+                return False
+            self.misses += 1
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# اطلاعات کامل تسک و نتیجه تشخیص تیم، با کلید task_id
+task_cache = TTLCache(TASK_CACHE_SIZE, TASK_CACHE_TTL)
+team_cache = TTLCache(TASK_CACHE_SIZE, TASK_CACHE_TTL)
+
+# آلبوم‌های ارسال شده به ادمین: "chat_id:media_group_id" → (file_idها، کپشن)
+ALBUM_CACHE_SIZE = int(os.getenv("ALBUM_CACHE_SIZE", 256))
+album_cache = TTLCache(ALBUM_CACHE_SIZE, 7 * 24 * 3600)
+
+# رویدادهایی که تسک را تغییر می‌دهند و کش آن را باطل می‌کنند
+TASK_CHANGE_EVENTS = {
+    "taskUpdated",
+    "taskStatusUpdated",
+    "taskPriorityUpdated",
+    "taskAssigneeUpdated",
+    "taskDueDateUpdated",
+    "taskTagUpdated",
+    "taskMoved",
+    "taskDeleted",
+}
+
+
+def invalidate_task(task_id):
+    task_cache.invalidate(task_id)
+    team_cache.invalidate(task_id)
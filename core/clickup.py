@@ -0,0 +1,121 @@
+"""
+ClickUp API: اطلاعات تسک، کامنت‌ها و تشخیص تیم
+"""
+
+import os
+
+from .settings import TEAMS, GENERAL, CLICKUP_API_TOKEN
+from .cache import task_cache, team_cache
+from .routing import TeamRouter
+from .flow import ClickUp, blocking
+from .ratelimit import PRIORITY_HIGH, PRIORITY_LOW
+from .cursor import comment_date
+from .media import attachment_from_image
+
+# هر صفحه /comment حداکثر ۲۵ کامنت (جدیدترین اول)؛ سقف صفحه‌های عقب‌تر برای یک رویداد
+COMMENT_PAGE_SIZE = 25
+COMMENT_MAX_PAGES = int(os.getenv("COMMENT_MAX_PAGES", 4))
+# هر صفحه /team/{id}/task حداکثر ۱۰۰ تسک
+TASK_PAGE_SIZE = 100
+
+
+@blocking
+def get_new_comments(task_id, cursor=None, max_pages=COMMENT_MAX_PAGES, priority=PRIORITY_HIGH):
+    """
+    کامنت‌های جدیدتر از cursor (comment_id، تاریخ) به ترتیب زمانی.
+    ClickUp فقط صفحه‌بندی رو به عقب دارد (start / start_id = قدیمی‌ترین کامنت صفحه قبل):
+    از جدیدترین صفحه شروع و به محض رسیدن به cursor متوقف می‌شود، پس کل thread دانلود
+    نمی‌شود. بدون cursor (اولین بار) فقط آخرین کامنت.
+    """
+    if not CLICKUP_API_TOKEN:return []
+    path=f"/api/v2/task/{task_id}/comment"
+    found=[]; params=None
+    try:
+        for _ in range(max(1, max_pages)):
+            page=(yield ClickUp(path, params, priority)).get('comments',[])
+            if cursor is None:return page[:1]
+            for comment in page:
+                if str(comment.get('id'))==cursor[0] or comment_date(comment)<=cursor[1]:
+                    return found[::-1]
+                found.append(comment)
+            if len(page)<COMMENT_PAGE_SIZE:break
+            oldest=page[-1]
+            params={"start": oldest.get('date'), "start_id": oldest.get('id')}
+        else:
+            print(f"ClickUp Warning: comment cursor of {task_id} not reached after {max_pages} pages")
+    except Exception as e:
+        print(f"ClickUp Error: comments {task_id} {e}")
+    return found[::-1]
+
+@blocking
+def get_task(task_id, priority=PRIORITY_HIGH):
+    if not CLICKUP_API_TOKEN:return None
+    cached=task_cache.get(task_id)
+    if cached is not None:return cached
+    try:
+        task=yield ClickUp(f"/api/v2/task/{task_id}", priority=priority)
+    except Exception as e:
+        print(f"ClickUp Error: task {task_id} {e}")
+        return None
+    task_cache.set(task_id,task)
+    return task
+
+@blocking
+def get_updated_tasks(team_id, updated_gt):
+    """
+    یک صفحه از تسک‌های workspace که بعد از updated_gt (ms) تغییر کرده‌اند، قدیمی‌ترین اول
+    → (tasks، آخرین صفحه؟). صفحه بعد با updated_gt جدید گرفته می‌شود (core.poller).
+    خطا به فراخواننده می‌رسد تا watermark جلو نرود.
+    """
+    result=yield ClickUp(f"/api/v2/team/{team_id}/task", {
+        "date_updated_gt": updated_gt, "order_by": "updated", "reverse": "true",
+        "subtasks": "true", "include_closed": "true", "page": 0}, PRIORITY_LOW)
+    tasks=result.get('tasks',[])
+    return tasks, bool(result.get('last_page', len(tasks)<TASK_PAGE_SIZE))
+
+def get_images_from_comment(comment):
+    """تصاویر کامنت به شکل Attachment (شناسه پیوست برای کش file_id تلگرام)"""
+    images = []
+    comment_parts = comment.get('comment', [])
+    if isinstance(comment_parts, list):
+        for part in comment_parts:
+            if part.get('type') == 'image':
+                attachment = attachment_from_image(part.get('image', {}))
+                if attachment:
+                    images.append(attachment)
+    return images
+
+def get_text_from_comment(comment):
+    text_parts = []
+    comment_parts = comment.get('comment', [])
+    if isinstance(comment_parts, list):
+        for part in comment_parts:
+            if part.get('type') != 'image':
+                txt = part.get('text', '').strip()
+                if txt and not txt.endswith('.png') and not txt.endswith('.jpg'):
+                    text_parts.append(txt)
+    return ' '.join(text_parts).strip() or comment.get('comment_text', '')
+
+
+# ─────────────────────────────────────────────────────────────────────────────────
+#  🏢 تشخیص تیم
+# ─────────────────────────────────────────────────────────────────────────────────
+
+team_router = TeamRouter(TEAMS, GENERAL.get("team_field_name", "requestor"))
+
+def get_team_from_task(task_data):
+    """تشخیص تیم از فیلد Requestor"""
+    if not task_data:
+        return None, None
+    
+    task_id = task_data.get('id')
+    cached = team_cache.get(task_id) if task_id else None
+    if cached is not None:
+        return cached
+    
+    result = team_router.resolve(task_data)
+    # نتیجه منفی فقط وقتی کش می‌شود که تسک کامل بوده (custom_fields دارد) و واقعا فیلد تیم
+    # ندارد؛ تسک ناقص payload وقتی دریافت تسک شکست خورده، دفعه بعد دوباره بررسی شود
+    if task_id and (result[0] is not None or 'custom_fields' in task_data):
+        team_cache.set(task_id, result)
+    return result
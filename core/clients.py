@@ -0,0 +1,229 @@
+"""
+کلاینت‌های HTTP مشترک (keep-alive) برای Telegram و ClickUp
+
+هر پروسه برای هر host یک کلاینت با connection pool دارد، پس هزینه
+TCP/TLS handshake فقط یک بار در هر worker پرداخت می‌شود.
+"""
+
+import os
+import uuid
+import atexit
+import threading
+import importlib.util
+from urllib.parse import urlsplit
+
+from . import codec
+from .ratelimit import clickup_governor
+from .media import UPLOAD_CHUNK, UPLOAD_MAX_BYTES
+
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org")
+CLICKUP_API_BASE = os.getenv("CLICKUP_API_BASE", "https://api.clickup.com")
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+
+# HTTP/2 فقط اگر پکیج h2 نصب باشد (بدون import کردن آن در شروع)
+HTTP2 = os.getenv("HTTP2", "1") != "0" and importlib.util.find_spec("h2") is not None
+
+_clients = {}
+_clients_pid = None
+_lock = threading.Lock()
+
+# کلاینت‌های async به event loop وابسته‌اند (asgi.py)
+_async_clients = {}
+_async_loop = None
+
+
+def _client_options(httpx):
+    return dict(
+        http2=HTTP2,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    )
+
+
+def get_client(base_url):
+    """کلاینت مشترک این پروسه برای یک host"""
+    global _clients, _clients_pid
+    # کلاینت‌های ساخته شده قبل از fork نباید در worker استفاده شوند
+    if _clients_pid != os.getpid():
+        with _lock:
+            if _clients_pid != os.getpid():
+                _clients = {}
+                _clients_pid = os.getpid()
+    client = _clients.get(base_url)
+    if client is None:
+        with _lock:
+            client = _clients.get(base_url)
+            if client is None:
+                # import سنگین httpx فقط در اولین درخواست (cold start سرورلس)
+                import httpx
+                client = httpx.Client(base_url=base_url, **_client_options(httpx))
+                _clients[base_url] = client
+    return client
+
+
+def get_async_client(base_url):
+    """کلاینت async مشترک event loop جاری برای یک host"""
+    global _async_clients, _async_loop
+    import asyncio
+    loop = asyncio.get_running_loop()
+    if _async_loop is not loop:
+        _async_clients = {}
+        _async_loop = loop
+    client = _async_clients.get(base_url)
+    if client is None:
+        import httpx
+        client = _async_clients[base_url] = httpx.AsyncClient(base_url=base_url, **_client_options(httpx))
+    return client
+
+
+async def aclose_clients():
+    for client in list(_async_clients.values()):
+        await client.aclose()
+    _async_clients.clear()
+
+
+def close_clients():
+    if _clients_pid != os.getpid():
+        return
+    for client in list(_clients.values()):
+        client.close()
+    _clients.clear()
+
+
+atexit.register(close_clients)
+
+
+# بدنه‌ها با core.codec (orjson در صورت نصب) ساخته و خوانده می‌شوند، نه json داخلی httpx
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def telegram_call(token, method, params):
+    """فراخوانی متد Bot API - پاسخ JSON تلگرام (شامل خطاها مثل 429) را برمی‌گرداند"""
+    response = get_client(TELEGRAM_API_BASE).post(f"/bot{token}/{method}", content=codec.dumps(params),
+                                                  headers=_JSON_HEADERS)
+    return codec.loads(response.content)
+
+
+def clickup_get(token, path, params=None):
+    """درخواست GET به ClickUp API - در صورت خطای HTTP استثنا می‌دهد"""
+    response = get_client(CLICKUP_API_BASE).get(path, params=params, headers={"Authorization": token})
+    clickup_governor.update(response.status_code, response.headers)
+    response.raise_for_status()
+    return codec.loads(response.content)
+
+
+async def telegram_acall(token, method, params):
+    response = await get_async_client(TELEGRAM_API_BASE).post(f"/bot{token}/{method}", content=codec.dumps(params),
+                                                               headers=_JSON_HEADERS)
+    return codec.loads(response.content)
+
+
+async def clickup_aget(token, path, params=None):
+    response = await get_async_client(CLICKUP_API_BASE).get(path, params=params, headers={"Authorization": token})
+    clickup_governor.update(response.status_code, response.headers)
+    response.raise_for_status()
+    return codec.loads(response.content)
+
+
+# ─────────────────────────────────────────────────────────────────
+#  آپلود جریانی (core.media)
+# ─────────────────────────────────────────────────────────────────
+
+def _multipart(params, files, boundary):
+    """
+    بدنه multipart/form-data تکه به تکه: bytes ثابت، یا نام فیلد فایل که محتوای آن
+    باید همان‌جا (از دانلود جریانی) قرار بگیرد.
+    """
+    for name, value in params.items():
+        value = value if isinstance(value, str) else codec.dumps(value).decode()
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+    for field, (filename, _) in files.items():
+        filename = filename.replace('"', "").replace("\r", "").replace("\n", "")
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+               f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        yield field
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode()
+
+
+def _source(url, token):
+    """کلاینت host فایل و هدرها؛ پیوست‌های خصوصی ClickUp با توکن API خوانده می‌شوند"""
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    clickup = host == "clickup.com" or host.endswith((".clickup.com", ".clickup-attachments.com"))
+    headers = {"Authorization": token} if token and clickup else {}
+    return f"{parts.scheme}://{parts.netloc}", headers
+
+
+def _check_size(url, size):
+    if size > UPLOAD_MAX_BYTES:
+        raise ValueError(f"attachment larger than {UPLOAD_MAX_BYTES} bytes: {url}")
+
+
+def _download(url, token):
+    origin, headers = _source(url, token)
+    with get_client(origin).stream("GET", url, headers=headers, follow_redirects=True) as response:
+        response.raise_for_status()
+        _check_size(url, int(response.headers.get("Content-Length") or 0))
+        size = 0
+        for chunk in response.iter_bytes(UPLOAD_CHUNK):
+            size += len(chunk)
+            _check_size(url, size)
+            yield chunk
+
+
+async def _adownload(url, token):
+    origin, headers = _source(url, token)
+    async with get_async_client(origin).stream("GET", url, headers=headers, follow_redirects=True) as response:
+        response.raise_for_status()
+        _check_size(url, int(response.headers.get("Content-Length") or 0))
+        size = 0
+        async for chunk in response.aiter_bytes(UPLOAD_CHUNK):
+            size += len(chunk)
+            _check_size(url, size)
+            yield chunk
+
+
+def telegram_upload(token, method, params, files, source_token=None):
+    """
+    فراخوانی Bot API با فایل: files = {فیلد: (نام فایل، URL)}؛ هر فایل هم‌زمان با
+    آپلود از URL دانلود می‌شود و فقط یک تکه در حافظه است.
+    """
+    boundary = uuid.uuid4().hex
+
+    def body():
+        for part in _multipart(params, files, boundary):
+            if isinstance(part, bytes):
+                yield part
+            else:
+                yield from _download(files[part][1], source_token)
+
+    response = get_client(TELEGRAM_API_BASE).post(
+        f"/bot{token}/{method}", content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    return codec.loads(response.content)
+
+
+async def telegram_aupload(token, method, params, files, source_token=None):
+    boundary = uuid.uuid4().hex
+
+    async def body():
+        for part in _multipart(params, files, boundary):
+            if isinstance(part, bytes):
+                yield part
+            else:
+                async for chunk in _adownload(files[part][1], source_token):
+                    yield chunk
+
+    response = await get_async_client(TELEGRAM_API_BASE).post(
+        f"/bot{token}/{method}", content=body(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+    return codec.loads(response.content)
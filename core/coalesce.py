@@ -0,0 +1,103 @@
+"""
+ادغام رویدادهای پشت سر هم یک تسک در یک پنجره زمانی (debounce)
+
+ClickUp برای یک کار چند webhook می‌فرستد (وضعیت + assignee + کامنت).
+رویدادهای یک تسک که داخل پنجره برسند با هم به flush داده می‌شوند.
+خلاصه پیام‌های تیم (digest) هم از همین زمان‌بند با پنجره و سقف تعداد اختصاصی استفاده می‌کند.
+"""
+
+import os
+import time
+import heapq
+import threading
+
+COALESCE_WINDOW = float(os.getenv("COALESCE_WINDOW", 0))
+COALESCE_MAX_PENDING = int(os.getenv("COALESCE_MAX_PENDING", 1000))
+
+
+class Coalescer:
+    """یک thread زمان‌بند؛ رویدادهای هر کلید بعد از window ثانیه flush می‌شوند"""
+
+    def __init__(self, window, flush, max_pending=COALESCE_MAX_PENDING):
+        self.window = window
+        self.flush = flush
+        self.max_pending = max_pending
+        self._pending = {}
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self.merged = 0
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        self._pending, self._heap = {}, []
+        self._thread = threading.Thread(target=self._run, name="coalescer", daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    def add(self, key, event, window=None, max_items=None):
+        """
+        افزودن رویداد؛ اگر تعداد کلیدهای در انتظار از حد بگذرد False برمی‌گرداند.
+        window / max_items: پنجره اختصاصی این کلید و flush فوری بعد از این تعداد
+        """
+        full = None
+        with self._cond:
+            self._ensure_started()
+            entry = self._pending.get(key)
+            if entry is not None:
+                entry[1].append(event)
+                self.merged += 1
+                if max_items and len(entry[1]) >= max_items:
+                    full = self._pending.pop(key)[1]
+            else:
+                if len(self._pending) >= self.max_pending:
+                    return False
+                if max_items == 1:
+                    full = [event]
+                else:
+                    self._seq += 1
+                    self._pending[key] = (self._seq, [event])
+                    deadline = time.monotonic() + (self.window if window is None else window)
+                    heapq.heappush(self._heap, (deadline, self._seq, key))
+                    self._cond.notify()
+        if full:
+            self._flush(key, full)
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                _, seq, key = heapq.heappop(self._heap)
+                entry = self._pending.get(key)
+                # دسته‌ای که زودتر (با max_items) flush شده و دسته جدید همان کلید کنار گذاشته می‌شوند
+                events = self._pending.pop(key)[1] if entry and entry[0] == seq else None
+            if events:
+                self._flush(key, events)
+
+    def _flush(self, key, events):
+        try:
+            self.flush(key, events)
+        except Exception as e:
+            print(f"Coalesce Error: {e}")
+
+    def flush_all(self):
+        """flush فوری همه رویدادهای در انتظار (هنگام خاموش شدن)"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            pending, self._pending, self._heap = self._pending, {}, []
+        for key, (_, events) in pending.items():
+            self._flush(key, events)
+
+    def depth(self):
+        return len(self._pending)
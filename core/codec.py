@@ -0,0 +1,37 @@
+"""
+JSON سریع برای بدنه webhookها و درخواست‌های خروجی
+
+اگر orjson نصب باشد از آن استفاده می‌شود، وگرنه json استاندارد (خروجی هر دو
+یکسان است: UTF-8 فشرده بدون escape حروف فارسی). JSON_BACKEND=json اجبار stdlib.
+"""
+
+import os
+import json
+
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+try:
+    if JSON_BACKEND == "json":
+        raise ImportError
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+DecodeError = ValueError  # orjson.JSONDecodeError و json.JSONDecodeError هر دو ValueError هستند
+
+
+if orjson:
+    def loads(data):
+        """bytes / str → شیء پایتون (خطا: ValueError)"""
+        return orjson.loads(data)
+
+    def dumps(obj, sort_keys=False):
+        """شیء پایتون → bytes (UTF-8)"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj, sort_keys=False):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode()
@@ -0,0 +1,101 @@
+"""
+cursor کامنت‌های هر تسک: آخرین کامنت اعلام شده (id و تاریخ)
+
+رویدادهای automation کامنت را در payload ندارند؛ با cursor فقط کامنت‌های
+جدیدتر از آخرین اعلام شده دریافت و همه به ترتیب ارسال می‌شوند (core.clickup.
+get_new_comments). کامنت‌های webhook هم cursor را جلو می‌برند. مثل DEDUPE_DB
+با COMMENT_CURSOR_DB می‌توان cursorها را بین workerها و ری‌استارت‌ها نگه داشت.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+from .cache import TTLCache
+
+COMMENT_CURSOR_SIZE = int(os.getenv("COMMENT_CURSOR_SIZE", 10000))
+COMMENT_CURSOR_TTL = float(os.getenv("COMMENT_CURSOR_TTL", 30 * 24 * 3600))
+COMMENT_CURSOR_DB = os.getenv("COMMENT_CURSOR_DB", "")
+
+_UPSERT = """
+INSERT INTO comment_cursors (task_id, comment_id, date, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (task_id) DO UPDATE SET comment_id = excluded.comment_id, date = excluded.date,
+    updated_at = excluded.updated_at
+WHERE excluded.date > comment_cursors.date
+"""
+
+
+def comment_date(comment):
+    try:
+        return int(comment.get("date") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class CommentCursors:
+    """task_id → (comment_id، تاریخ ms) آخرین کامنت اعلام شده"""
+
+    def __init__(self, size=COMMENT_CURSOR_SIZE, ttl=COMMENT_CURSOR_TTL, db_path=COMMENT_CURSOR_DB):
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory = TTLCache(size, ttl)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.skipped = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS comment_cursors (task_id TEXT PRIMARY KEY, comment_id TEXT, "
+                         "date INTEGER NOT NULL, updated_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, task_id):
+        cursor = self._memory.get(task_id)
+        if cursor is None and self.db_path:
+            try:
+                row = self._conn().execute("SELECT comment_id, date FROM comment_cursors WHERE task_id = ? "
+                                           "AND updated_at > ?", (task_id, time.time() - self.ttl)).fetchone()
+            except sqlite3.Error as e:
+                print(f"Cursor Error: {e}")
+                row = None
+            if row:
+                cursor = (row[0], row[1])
+                self._memory.set(task_id, cursor)
+        return cursor
+
+    def claim(self, task_id, comments, skip_older=True):
+        """
+        کامنت‌ها (به ترتیب زمانی) → آن‌هایی که هنوز اعلام نشده‌اند؛ cursor به جدیدترین می‌رود.
+        skip_older=False برای کامنت‌های webhook: فقط cursor جلو می‌رود و چیزی حذف نمی‌شود
+        (webhookها ممکن است نامرتب برسند).
+        """
+        if not task_id or not comments:
+            return list(comments or [])
+        with self._lock:
+            cursor = self.get(task_id)
+            if skip_older and cursor:
+                fresh = [c for c in comments if comment_date(c) > cursor[1] and str(c.get("id")) != cursor[0]]
+                self.skipped += len(comments) - len(fresh)
+            else:
+                fresh = list(comments)
+            newest = max(comments, key=comment_date)
+            if comment_date(newest) and (not cursor or comment_date(newest) > cursor[1]):
+                cursor = (str(newest.get("id")), comment_date(newest))
+                self._memory.set(task_id, cursor)
+                if self.db_path:
+                    try:
+                        self._conn().execute(_UPSERT, (task_id, *cursor, time.time()))
+                    except sqlite3.Error as e:
+                        print(f"Cursor Error: {e}")
+        return fresh
+
+    def stats(self):
+        return {"tracked": len(self._memory), "skipped": self.skipped, "shared": bool(self.db_path)}
+
+
+comment_cursors = CommentCursors()
@@ -0,0 +1,38 @@
+"""
+تاریخ شمسی به وقت ایران
+"""
+
+from datetime import datetime, timedelta, timezone
+
+# تایم‌زون ایران (UTC+3:30)
+IRAN_TZ = timezone(timedelta(hours=3, minutes=30))
+
+MONTHS = ["فروردین","اردیبهشت","خرداد","تیر","مرداد","شهریور","مهر","آبان","آذر","دی","بهمن","اسفند"]
+
+
+def jalali(gy,gm,gd):
+    g=[0,31,59,90,120,151,181,212,243,273,304,334]
+    jy=979 if gy>1600 else 0
+    gy-=1600 if gy>1600 else 621
+    gy2=gy+1 if gm>2 else gy
+    d=(365*gy)+(gy2+3)//4-(gy2+99)//100+(gy2+399)//400-80+gd+g[gm-1]
+    jy+=33*(d//12053);d%=12053
+    jy+=4*(d//1461);d%=1461
+    if d>365:jy+=(d-1)//365;d=(d-1)%365
+    return (jy,1+d//31,1+d%31) if d<186 else (jy,7+(d-186)//30,1+(d-186)%30)
+
+def fmt(ts):
+    """timestamp (ثانیه یا میلی‌ثانیه) → تاریخ شمسی؛ اگر نامعتبر بود زمان فعلی"""
+    try:
+        ts=int(ts)
+        if ts>1e10:ts/=1000
+        dt=datetime.fromtimestamp(ts, tz=timezone.utc).astimezone(IRAN_TZ)
+    except:
+        dt=datetime.now(IRAN_TZ)
+    jy,jm,jd=jalali(dt.year,dt.month,dt.day)
+    return f"{jd} {MONTHS[jm-1]} {jy} - ساعت {dt.strftime('%H:%M')}"
+
+def fmt_day(day):
+    """date → «۲۵ مهر ۱۴۰۵»"""
+    jy,jm,jd=jalali(day.year,day.month,day.day)
+    return f"{jd} {MONTHS[jm-1]} {jy}"
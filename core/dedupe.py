@@ -0,0 +1,103 @@
+"""
+حذف webhookهای تکراری ClickUp (ارسال دوباره بعد از timeout)
+
+کلید هر رویداد از id آیتم‌های history (یا trigger_id در automationها) ساخته
+می‌شود و در یک LRU با TTL نگه داشته می‌شود. برای چند worker در gunicorn
+می‌توان با DEDUPE_DB یک فایل SQLite مشترک تعیین کرد.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+from .cache import TTLCache
+
+DEDUPE_SIZE = int(os.getenv("DEDUPE_SIZE", 10000))
+DEDUPE_TTL = float(os.getenv("DEDUPE_TTL", 3600))
+DEDUPE_DB = os.getenv("DEDUPE_DB", "")
+
+
+def event_key(data, body=None):
+    """کلید یکتای رویداد webhook؛ اگر شناسه‌ای نبود hash بدنه خام"""
+    history_ids = [str(h.get("id")) for h in data.get("history_items") or [] if h.get("id")]
+    if history_ids:
+        return f"{data.get('webhook_id', '')}:{data.get('event', '')}:{','.join(history_ids)}"
+    if data.get("trigger_id"):
+        return f"auto:{data.get('auto_id', '')}:{data['trigger_id']}"
+    if body:
+        return "body:" + hashlib.sha256(body).hexdigest()
+    return None
+
+
+class IdempotencyStore:
+    """ثبت رویدادهای دیده شده؛ seen(key) برای تکراری‌ها True برمی‌گرداند"""
+
+    def __init__(self, size=DEDUPE_SIZE, ttl=DEDUPE_TTL, db_path=DEDUPE_DB):
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory = TTLCache(size, ttl)
+        self._local = threading.local()
+        self.duplicates = 0
+        self._last_purge = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS seen_events (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _claim_shared(self, key):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM seen_events WHERE key = ? AND expires < ?", (key, now))
+            cur = conn.execute("INSERT OR IGNORE INTO seen_events (key, expires) VALUES (?, ?)", (key, now + self.ttl))
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        if now - self._last_purge > 600:
+            self._last_purge = now
+            conn.execute("DELETE FROM seen_events WHERE expires < ?", (now,))
+        return cur.rowcount == 1
+
+    def seen(self, key):
+        """True اگر این رویداد قبلا دیده شده باشد؛ در غیر این صورت ثبت می‌شود"""
+        if not key:
+            return False
+        if not self._memory.add(key):
+            self.duplicates += 1
+            return True
+        if self.db_path:
+            try:
+                if not self._claim_shared(key):
+                    self.duplicates += 1
+                    return True
+            except sqlite3.Error as e:
+                # خطای دیتابیس نباید رویداد را از بین ببرد
+                print(f"Dedupe Error: {e}")
+        return False
+
+    def forget(self, key):
+        """حذف کلید (وقتی رویداد پذیرفته نشد و ClickUp باید دوباره بفرستد)"""
+        if not key:
+            return
+        self._memory.invalidate(key)
+        if self.db_path:
+            try:
+                self._conn().execute("DELETE FROM seen_events WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                print(f"Dedupe Error: {e}")
+
+    def stats(self):
+        return {"duplicates": self.duplicates, "tracked": len(self._memory), "shared": bool(self.db_path)}
+
+
+idempotency = IdempotencyStore()
@@ -0,0 +1,160 @@
+"""
+صف تحویل پس‌زمینه - پردازش رویدادهای وب‌هوک بعد از پاسخ به ClickUp
+"""
+
+import os
+import time
+import queue
+import atexit
+import threading
+
+QUEUE_MAXSIZE = int(os.getenv("QUEUE_MAXSIZE", 1000))
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", 4))
+QUEUE_SHUTDOWN_TIMEOUT = float(os.getenv("QUEUE_SHUTDOWN_TIMEOUT", 25))
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", 200))
+
+_STOP = object()
+
+
+class DeliveryQueue:
+    """صف محدود با تعداد ثابت worker"""
+
+    def __init__(self, maxsize=QUEUE_MAXSIZE, workers=QUEUE_WORKERS):
+        self.maxsize = maxsize
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._pid = None
+        self._closed = False
+
+    def _ensure_started(self):
+        # gunicorn بعد از import پروسه را fork می‌کند؛ threadها باید در همان worker ساخته شوند
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._threads = [
+                threading.Thread(target=self._run, name=f"delivery-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+            self._pid = os.getpid()
+            self._closed = False
+
+    def _run(self):
+        q = self._queue
+        while True:
+            item = q.get()
+            try:
+                if item is _STOP:
+                    return
+                fn, args, kwargs = item
+                fn(*args, **kwargs)
+            except Exception as e:
+                print(f"Delivery Error: {e}")
+            finally:
+                q.task_done()
+
+    def submit(self, fn, *args, **kwargs):
+        """افزودن کار به صف - اگر صف پر باشد False برمی‌گرداند"""
+        if self._closed:
+            return False
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((fn, args, kwargs))
+            return True
+        except queue.Full:
+            return False
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def shutdown(self, timeout=QUEUE_SHUTDOWN_TIMEOUT):
+        """خالی کردن صف و توقف workerها"""
+        if self._closed or self._pid != os.getpid():
+            return
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        # علامت توقف پشت کارهای موجود قرار می‌گیرد، پس صف اول خالی می‌شود
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        pending = self._queue.qsize()
+        if pending:
+            print(f"Delivery: {pending} items dropped on shutdown")
+
+
+class AsyncDeliveryQueue:
+    """
+    همان رابط DeliveryQueue روی event loop (asgi.py): هر کار یک task است و
+    flowها (core.flow.blocking) با کلاینت‌های async اجرا می‌شوند.
+    submit از threadهای دیگر (پنجره ادغام، outbox) هم قابل صدا زدن است.
+    """
+
+    def __init__(self, loop, maxsize=QUEUE_MAXSIZE, concurrency=ASYNC_CONCURRENCY):
+        import asyncio
+        self.maxsize = maxsize
+        self._loop = loop
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, fn, *args, **kwargs):
+        """افزودن کار - اگر تعداد کارهای باز به maxsize رسیده باشد False برمی‌گرداند"""
+        with self._lock:
+            if self._closed or self._pending >= self.maxsize:
+                return False
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._spawn, fn, args, kwargs)
+        return True
+
+    def _spawn(self, fn, args, kwargs):
+        task = self._loop.create_task(self._run(fn, args, kwargs))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, fn, args, kwargs):
+        from .flow import arun
+        try:
+            async with self._semaphore:
+                if hasattr(fn, "flow"):
+                    await arun(fn.flow(*args, **kwargs))
+                else:
+                    await self._loop.run_in_executor(None, lambda: fn(*args, **kwargs))
+        except Exception as e:
+            print(f"Delivery Error: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def depth(self):
+        return self._pending
+
+    async def drain(self, timeout=QUEUE_SHUTDOWN_TIMEOUT):
+        """صبر برای تمام شدن کارهای باز (هنگام خاموش شدن)"""
+        import asyncio
+        self._closed = True
+        # کارهایی که با call_soon_threadsafe در راه‌اند اول ساخته شوند
+        await asyncio.sleep(0)
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+        if self._pending:
+            print(f"Delivery: {self._pending} items dropped on shutdown")
+
+    def shutdown(self, timeout=QUEUE_SHUTDOWN_TIMEOUT):
+        # خالی کردن با drain در lifespan انجام می‌شود
+        self._closed = True
+
+
+delivery_queue = DeliveryQueue()
+atexit.register(delivery_queue.shutdown)
@@ -0,0 +1,44 @@
+"""
+حالت خلاصه (digest) برای گروه تیم‌ها
+
+پیام‌هایی که برای تیمی با digest فعال تایید می‌شوند فورا ارسال نمی‌شوند؛
+هر interval_minutes دقیقه یا بعد از max_items پیام (هر کدام زودتر) یک پیام
+ترکیبی به گروه تیم می‌رود. بافر در حافظه است و هنگام خاموش شدن flush می‌شود.
+
+    TEAMS["facility"]["digest"] = {"enabled": True, "interval_minutes": 30, "max_items": 20}
+"""
+
+from .coalesce import Coalescer
+
+DIGEST_INTERVAL_MINUTES = 30
+DIGEST_MAX_ITEMS = 20
+
+
+class TeamDigest:
+    """بافر پیام‌های هر تیم روی Coalescer؛ flush(team_key, texts)"""
+
+    def __init__(self, teams, flush):
+        self.configs = {key: team["digest"] for key, team in teams.items()
+                        if (team.get("digest") or {}).get("enabled")}
+        self._buffer = Coalescer(0, flush, max_pending=max(len(self.configs), 1))
+        self.buffered = 0
+
+    def enabled(self, team_key):
+        return team_key in self.configs
+
+    def add(self, team_key, text):
+        """True اگر پیام در خلاصه تیم قرار گرفت (تیم بدون digest → False)"""
+        conf = self.configs.get(team_key)
+        if not conf or not text:
+            return False
+        window = float(conf.get("interval_minutes", DIGEST_INTERVAL_MINUTES)) * 60
+        if not self._buffer.add(team_key, text, window, int(conf.get("max_items", DIGEST_MAX_ITEMS))):
+            return False
+        self.buffered += 1
+        return True
+
+    def flush_all(self):
+        self._buffer.flush_all()
+
+    def stats(self):
+        return {"teams": sorted(self.configs), "pending_teams": self._buffer.depth(), "buffered": self.buffered}
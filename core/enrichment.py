@@ -0,0 +1,64 @@
+"""
+دریافت هم‌زمان اطلاعات تکمیلی از ClickUp (تسک، کامنت و ...)
+"""
+
+import os
+import time
+import threading
+
+from .metrics import enrich_timeouts
+
+ENRICH_TIMEOUT = float(os.getenv("ENRICH_TIMEOUT", 8))
+ENRICH_THREADS = int(os.getenv("ENRICH_THREADS", 8))
+
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    if _executor_pid != os.getpid():
+        with _lock:
+            if _executor_pid != os.getpid():
+                from concurrent.futures import ThreadPoolExecutor
+                _executor = ThreadPoolExecutor(max_workers=ENRICH_THREADS, thread_name_prefix="enrich")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def enrich(fetchers, timeout=ENRICH_TIMEOUT, extend=None):
+    """
+    اجرای هم‌زمان fetcherها با یک مهلت کلی.
+    fetchers: دیکشنری نام → تابع بدون آرگومان
+    extend(elapsed): ثانیه‌های تمدید مهلت وقتی تمام شد (مثلا انتظار برای سهمیه ClickUp)
+    خروجی: دیکشنری نام → نتیجه (برای خطا یا اتمام مهلت None)
+    """
+    if not fetchers:
+        return {}
+    from concurrent.futures import wait
+    executor = _get_executor()
+    futures = {name: executor.submit(fn) for name, fn in fetchers.items()}
+    start = time.monotonic()
+    done, not_done = wait(futures.values(), timeout=timeout)
+    while not_done and extend:
+        extra = extend(time.monotonic() - start)
+        if extra <= 0:
+            break
+        more, not_done = wait(not_done, timeout=extra)
+        done |= more
+    for f in not_done:
+        f.cancel()
+
+    results = {}
+    for name, f in futures.items():
+        if f in done and f.exception() is None:
+            results[name] = f.result()
+        else:
+            if f not in done:
+                enrich_timeouts.inc(name)
+                print(f"Enrich Timeout: {name}")
+            else:
+                print(f"Enrich Error: {name} {f.exception()}")
+            results[name] = None
+    return results
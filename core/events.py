@@ -0,0 +1,113 @@
+"""
+تبدیل webhookهای ClickUp به رویدادهای یکسان
+
+دو فرمت پشتیبانی می‌شود:
+- webhook API: {"event": "taskCommentPosted", "task_id": ..., "history_items": [...]}
+  که کامنت یا مقدار قبل/بعد تغییر را در history_items دارد
+- automation: {"payload": {...task...}} بدون نوع رویداد (kind = "legacy")
+"""
+
+# نوع رویداد ClickUp → نوع داخلی
+EVENT_KINDS = {
+    "taskCommentPosted": "comment",
+    "taskStatusUpdated": "status",
+    "taskCreated": "created",
+    "taskPriorityUpdated": "priority",
+    "taskDueDateUpdated": "due_date",
+    "taskAssigneeUpdated": "assignee",
+}
+
+# نوع داخلی → کلید NOTIFICATIONS در config
+NOTIFICATION_KEYS = {
+    "comment": "comment_added",
+    "status": "status_changed",
+    "completed": "task_completed",
+    "created": "task_created",
+    "priority": "priority_changed",
+    "due_date": "due_date_changed",
+    "assignee": "assignee_changed",
+    "activity": "other_activity",
+}
+
+DONE_STATUSES = {"complete", "completed", "done", "closed"}
+
+
+def get_username(user):
+    user = user or {}
+    return user.get('username') or user.get('email') or '?'
+
+
+def is_completed(status):
+    """وضعیت بسته شده (type=closed یا نام done/complete)"""
+    if not isinstance(status, dict):
+        return False
+    return status.get('type') in ("closed", "done") or (status.get('status') or '').lower() in DONE_STATUSES
+
+
+def parse_event(data):
+    """
+    dict با کلیدهای:
+      kind, event, task_id, task_name, task (اطلاعات تسک موجود در payload یا None),
+      comment, before, after, field, username, date
+    """
+    payload = data.get("payload") or {}
+    history = (data.get("history_items") or [{}])[0]
+    event = data.get("event")
+    kind = EVENT_KINDS.get(event, "activity") if event else "legacy"
+
+    parsed = {
+        "kind": kind,
+        "event": event,
+        "task_id": payload.get("id") or data.get("task_id", ""),
+        "task_name": payload.get("name"),
+        # payload فرمت automation خود تسک است
+        "task": payload or None,
+        "comment": None,
+        "field": history.get("field"),
+        "before": history.get("before"),
+        "after": history.get("after"),
+        "username": get_username(history.get("user")) if history.get("user") else None,
+        "date": history.get("date") or data.get("date"),
+    }
+
+    if kind == "comment":
+        comment = history.get("comment")
+        if comment:
+            # در history متن کامنت text_content است، در API کامنت‌ها comment_text
+            comment = dict(comment)
+            comment.setdefault('comment_text', comment.get('text_content', ''))
+            parsed["comment"] = comment
+            parsed["date"] = comment.get('date') or parsed["date"]
+            parsed["username"] = get_username(comment.get('user') or history.get('user'))
+
+    elif kind == "status" and is_completed(parsed["after"]):
+        parsed["kind"] = "completed"
+
+    return parsed
+
+
+def needs_task(parsed_events, route_all=False):
+    """
+    اطلاعات کامل تسک لازم است؟ فقط اگر نام تسک در payload نباشد، یا برای تشخیص تیم
+    (دکمه‌های کامنت، یا همه رویدادها با route_all) فیلدهای custom در دسترس نباشد.
+    """
+    for p in parsed_events:
+        if not p["task_name"]:
+            return True
+        if (route_all or p["kind"] in ("comment", "legacy")) and "custom_fields" not in (p["task"] or {}):
+            return True
+    return False
+
+
+def comment_event(task, comment):
+    """
+    کامنت دریافتی از API (poller) → رویداد با فرمت webhook، تا همان parse و ساخت پیام
+    استفاده شود. payload خود تسک است، پس نام و فیلدهای تیم دوباره دریافت نمی‌شوند.
+    """
+    return {
+        "event": "taskCommentPosted",
+        "task_id": task.get("id"),
+        "payload": task,
+        "history_items": [{"id": comment.get("id"), "field": "comment", "user": comment.get("user"),
+                           "date": comment.get("date"), "comment": comment}],
+    }
@@ -0,0 +1,71 @@
+"""
+فیلتر ورودی رویدادها بر اساس NOTIFICATIONS (و تنظیمات اختصاصی هر تیم)
+
+فیلتر یک بار هنگام شروع ساخته می‌شود و بلافاصله بعد از بررسی امضا و parse
+کردن JSON اجرا می‌شود، پس رویدادهای غیرفعال هیچ درخواست شبکه‌ای ایجاد نمی‌کنند.
+"""
+
+import threading
+from collections import Counter
+
+from .events import parse_event, NOTIFICATION_KEYS
+
+# نوعی که اگر خودش خاموش بود با نوع کلی‌تر فرستاده می‌شود: تکمیل تسک هم یک تغییر وضعیت است
+FALLBACK_KINDS = {"completed": "status"}
+
+
+def _enabled_kinds(notifications):
+    return {kind for kind, key in NOTIFICATION_KEYS.items() if notifications.get(key, True)}
+
+
+class IngressFilter:
+    """فیلتر از پیش کامپایل شده + شمارنده پذیرفته/حذف شده برای هر نوع رویداد"""
+
+    def __init__(self, notifications, teams):
+        self.global_kinds = _enabled_kinds(notifications)
+        # تیم‌هایی که "notifications" اختصاصی دارند
+        self.team_kinds = {
+            key: _enabled_kinds({**notifications, **team["notifications"]})
+            for key, team in teams.items() if team.get("notifications")
+        }
+        # در ورودی هنوز تیم معلوم نیست → هر نوعی که برای حداقل یک تیم فعال است رد نمی‌شود
+        self.ingress_kinds = self.global_kinds.union(*self.team_kinds.values())
+        self.accepted = Counter()
+        self.dropped = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def has_team_overrides(self):
+        return bool(self.team_kinds)
+
+    def _count(self, counter, kind):
+        with self._lock:
+            counter[kind] += 1
+
+    def accept(self, data):
+        """بررسی رویداد خام webhook در ورودی"""
+        kind = parse_event(data)["kind"]
+        # فرمت automation نوع ندارد؛ بعد از گرفتن کامنت تصمیم گرفته می‌شود
+        if kind == "legacy" or kind in self.ingress_kinds or FALLBACK_KINDS.get(kind) in self.ingress_kinds:
+            self._count(self.accepted, kind)
+            return True
+        self._count(self.dropped, kind)
+        return False
+
+    def allowed_kind(self, kind, team_key=None):
+        """بررسی نهایی بعد از تشخیص تیم → همان نوع، نوع جایگزین (FALLBACK_KINDS) یا None"""
+        if kind == "legacy":
+            return kind
+        kinds = self.team_kinds.get(team_key, self.global_kinds)
+        if kind in kinds:
+            return kind
+        if FALLBACK_KINDS.get(kind) in kinds:
+            return FALLBACK_KINDS[kind]
+        self._count(self.dropped, kind)
+        return None
+
+    def allows(self, kind, team_key=None):
+        return self.allowed_kind(kind, team_key) is not None
+
+    def stats(self):
+        return {"accepted": dict(self.accepted), "dropped": dict(self.dropped)}
@@ -0,0 +1,169 @@
+"""
+اجرای منطق پردازش مستقل از نوع I/O (sans-IO)
+
+توابع پردازش generator هستند و به جای درخواست شبکه یک فراخوانی (Telegram /
+ClickUp / Gather) yield می‌کنند و نتیجه را پس می‌گیرند:
+- run: کلاینت‌های sync و thread pool (Flask، Vercel، صف تحویل)
+- arun: کلاینت‌های async؛ Gather با create_task و asyncio.wait (مهلت کلی، لغو باقی‌مانده‌ها) (asgi.py)
+پس هر دو حالت دقیقا یک منطق دارند.
+"""
+
+import functools
+from typing import NamedTuple
+
+from .settings import TELEGRAM_BOT_TOKEN, CLICKUP_API_TOKEN
+from .clients import telegram_call, clickup_get, telegram_acall, clickup_aget, telegram_upload, telegram_aupload
+from .ratelimit import telegram_scheduler, clickup_governor, PRIORITY_HIGH
+from .enrichment import enrich, ENRICH_TIMEOUT
+from .metrics import timed, atimed, clickup_method, enrich_timeouts
+from .singleflight import clickup_flight
+
+
+class Telegram(NamedTuple):
+    """فراخوانی Bot API → پاسخ JSON تلگرام؛ files = {فیلد: (نام، URL)} برای آپلود جریانی"""
+    method: str
+    params: dict
+    files: dict = None
+
+
+class ClickUp(NamedTuple):
+    """GET به ClickUp API → JSON (خطای HTTP به شکل استثنا)؛ priority برای سهمیه ClickUp"""
+    path: str
+    params: dict = None
+    priority: int = PRIORITY_HIGH
+
+
+class Gather(NamedTuple):
+    """اجرای هم‌زمان چند flow با یک مهلت کلی → نام: نتیجه (خطا / مهلت = None)"""
+    flows: dict
+    timeout: float = ENRICH_TIMEOUT
+
+
+def blocking(flow_fn):
+    """
+    نسخه sync یک flow با همان نام؛ خود generator در .flow در دسترس است
+    تا flowهای دیگر با yield from و arun از آن استفاده کنند.
+    """
+    @functools.wraps(flow_fn)
+    def wrapper(*args, **kwargs):
+        return run(flow_fn(*args, **kwargs))
+    wrapper.flow = flow_fn
+    return wrapper
+
+
+def _flight_key(effect):
+    """درخواست‌های ClickUp یکسان (مسیر و پارامترها) یک بار فرستاده می‌شوند"""
+    return effect.path, tuple(sorted((effect.params or {}).items()))
+
+
+def _scheduled(effect):
+    """chat_id برای صف نوبتی تلگرام؛ answerCallbackQuery نباید پشت پیام‌های چت بماند"""
+    if effect.method == "answerCallbackQuery":
+        return None
+    return effect.params.get("chat_id")
+
+
+# ─────────────────────────────────────────────────────────────────
+#  Sync
+# ─────────────────────────────────────────────────────────────────
+
+def _execute(effect):
+    if isinstance(effect, Telegram):
+        # هر تلاش (بعد از انتظار صف چت) جدا زمان‌گیری می‌شود
+        call = (lambda: telegram_upload(TELEGRAM_BOT_TOKEN, effect.method, effect.params, effect.files,
+                                        CLICKUP_API_TOKEN)) if effect.files else \
+            (lambda: telegram_call(TELEGRAM_BOT_TOKEN, effect.method, effect.params))
+        send = lambda: timed("telegram", effect.method, call)
+        chat_id = _scheduled(effect)
+        return telegram_scheduler.call(chat_id, send) if chat_id is not None else send()
+    if isinstance(effect, ClickUp):
+        fetch = lambda: timed("clickup", clickup_method(effect.path),
+                              lambda: clickup_get(CLICKUP_API_TOKEN, effect.path, effect.params))
+        return clickup_flight.do(_flight_key(effect), lambda: clickup_governor.call(effect.priority, fetch))
+    if isinstance(effect, Gather):
+        return enrich({name: functools.partial(run, f) for name, f in effect.flows.items()}, effect.timeout,
+                      extend=clickup_governor.extension)
+    raise TypeError(f"unknown effect {effect!r}")
+
+
+def run(flow):
+    """اجرای flow با I/O مسدود کننده"""
+    value, error = None, None
+    while True:
+        try:
+            effect = flow.throw(error) if error is not None else flow.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = _execute(effect)
+        except Exception as e:
+            error = e
+
+
+# ─────────────────────────────────────────────────────────────────
+#  Async
+# ─────────────────────────────────────────────────────────────────
+
+async def _gather(flows, timeout):
+    import asyncio
+    loop = asyncio.get_running_loop()
+    results = dict.fromkeys(flows)
+
+    async def one(name, flow):
+        try:
+            results[name] = await arun(flow)
+        except Exception as e:
+            print(f"Enrich Error: {name} {e}")
+
+    tasks = {loop.create_task(one(name, flow)): name for name, flow in flows.items()}
+    start = loop.time()
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        # مثل enrich: تا وقتی درخواستی منتظر سهمیه ClickUp است مهلت تمدید می‌شود
+        while pending:
+            extra = clickup_governor.extension(loop.time() - start)
+            if extra <= 0:
+                break
+            _, pending = await asyncio.wait(pending, timeout=extra)
+    finally:
+        for task in tasks:
+            task.cancel()
+    if pending:
+        names = [tasks[t] for t in pending]
+        for name in names:
+            enrich_timeouts.inc(name)
+        print(f"Enrich Timeout: {', '.join(names)}")
+    return results
+
+
+async def _aexecute(effect):
+    if isinstance(effect, Telegram):
+        call = (lambda: telegram_aupload(TELEGRAM_BOT_TOKEN, effect.method, effect.params, effect.files,
+                                         CLICKUP_API_TOKEN)) if effect.files else \
+            (lambda: telegram_acall(TELEGRAM_BOT_TOKEN, effect.method, effect.params))
+        send = lambda: atimed("telegram", effect.method, call)
+        chat_id = _scheduled(effect)
+        return await (telegram_scheduler.acall(chat_id, send) if chat_id is not None else send())
+    if isinstance(effect, ClickUp):
+        fetch = lambda: atimed("clickup", clickup_method(effect.path),
+                               lambda: clickup_aget(CLICKUP_API_TOKEN, effect.path, effect.params))
+        return await clickup_flight.ado(_flight_key(effect), lambda: clickup_governor.acall(effect.priority, fetch))
+    if isinstance(effect, Gather):
+        return await _gather(effect.flows, effect.timeout)
+    raise TypeError(f"unknown effect {effect!r}")
+
+
+async def arun(flow):
+    """اجرای flow روی event loop؛ لغو task مستقیما به بیرون می‌رود"""
+    value, error = None, None
+    while True:
+        try:
+            effect = flow.throw(error) if error is not None else flow.send(value)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = await _aexecute(effect)
+        except Exception as e:
+            error = e
@@ -0,0 +1,129 @@
+"""
+پیوست‌های تصویری ClickUp در تلگرام: کش file_id و آپلود جریانی
+
+بعد از اولین ارسال موفق هر پیوست، file_id تلگرام آن (بزرگ‌ترین سایز) با شناسه
+پیوست ClickUp ذخیره می‌شود؛ ارسال‌های بعدی همان file_id را می‌فرستند و تلگرام فایل
+را دوباره دانلود نمی‌کند. کش در حافظه و در TG_FILE_ID_DB (SQLite، مشترک بین
+workerها و ری‌استارت‌ها) نگه داشته می‌شود.
+
+اگر تلگرام نتواند URL را دریافت کند (نیاز به احراز هویت، حجم بیشتر از سقف URL)،
+core.clients فایل را تکه به تکه از ClickUp می‌خواند و مستقیما در بدنه multipart
+آپلود می‌کند؛ حافظه مصرفی به اندازه یک تکه (UPLOAD_CHUNK) است نه کل فایل.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from .cache import TTLCache
+
+TG_FILE_ID_DB = os.getenv("TG_FILE_ID_DB", "file_ids.db")
+TG_FILE_ID_SIZE = int(os.getenv("TG_FILE_ID_SIZE", 10000))
+# file_id ربات منقضی نمی‌شود؛ فقط برای محدود کردن اندازه کش
+TG_FILE_ID_TTL = float(os.getenv("TG_FILE_ID_TTL", 90 * 24 * 3600))
+UPLOAD_CHUNK = int(os.getenv("UPLOAD_CHUNK", 64 * 1024))
+# سقف آپلود عکس در Bot API
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", 10 * 1024 * 1024))
+
+
+class Attachment(NamedTuple):
+    """تصویر یک کامنت ClickUp: شناسه پیوست (کلید کش)، URL و نام فایل"""
+    id: str
+    url: str
+    name: str = "image.jpg"
+
+
+def attachment_from_image(image):
+    """بخش image کامنت ClickUp → Attachment (یا None اگر URL ندارد)"""
+    url = image.get('thumbnail_large') or image.get('url')
+    if not url:
+        return None
+    # بدون id (فرمت‌های قدیمی) مسیر URL بدون query امضا شناسه است
+    key = image.get('id') or urlsplit(url).path
+    name = image.get('name') or os.path.basename(urlsplit(url).path) or "image.jpg"
+    return Attachment(str(key), url, name)
+
+
+class FileIdCache:
+    """شناسه پیوست ClickUp → file_id تلگرام"""
+
+    def __init__(self, size=TG_FILE_ID_SIZE, ttl=TG_FILE_ID_TTL, db_path=TG_FILE_ID_DB):
+        self.ttl = ttl
+        self.db_path = db_path
+        self._memory = TTLCache(size, ttl)
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self.stale = 0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS file_ids (attachment_id TEXT PRIMARY KEY, "
+                         "file_id TEXT NOT NULL, created_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, attachment_id):
+        file_id = self._memory.get(attachment_id)
+        if file_id is None and self.db_path:
+            try:
+                row = self._conn().execute("SELECT file_id FROM file_ids WHERE attachment_id = ? AND created_at > ?",
+                                           (attachment_id, time.time() - self.ttl)).fetchone()
+            except sqlite3.Error as e:
+                print(f"File ID Cache Error: {e}")
+                row = None
+            if row:
+                file_id = row[0]
+                self._memory.set(attachment_id, file_id)
+        if file_id is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return file_id
+
+    def set(self, attachment_id, file_id):
+        self._memory.set(attachment_id, file_id)
+        if self.db_path:
+            try:
+                self._conn().execute("INSERT OR REPLACE INTO file_ids VALUES (?, ?, ?)",
+                                     (attachment_id, file_id, time.time()))
+            except sqlite3.Error as e:
+                print(f"File ID Cache Error: {e}")
+
+    def forget(self, attachment_id):
+        """file_id که تلگرام دیگر قبول نمی‌کند → حذف از حافظه و SQLite"""
+        self._memory.invalidate(attachment_id)
+        self.stale += 1
+        if self.db_path:
+            try:
+                self._conn().execute("DELETE FROM file_ids WHERE attachment_id = ?", (attachment_id,))
+            except sqlite3.Error as e:
+                print(f"File ID Cache Error: {e}")
+
+    def resolve(self, photo):
+        """Attachment → file_id ذخیره شده یا URL؛ رشته (file_id / URL) همان‌طور"""
+        if isinstance(photo, Attachment):
+            return self.get(photo.id) or photo.url
+        return photo
+
+    def remember(self, photos, messages):
+        """file_id پیام‌های ارسال شده (به ترتیب photos) برای پیوست‌های ClickUp"""
+        for photo, message in zip(photos, messages):
+            if isinstance(photo, Attachment) and message.get("photo"):
+                self.set(photo.id, message["photo"][-1]["file_id"])
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"size": len(self._memory), "hits": self.hits, "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0, "uploads": self.uploads,
+                "stale": self.stale, "shared": bool(self.db_path)}
+
+
+file_ids = FileIdCache()
@@ -0,0 +1,263 @@
+"""
+متریک‌های Prometheus (/metrics) بدون وابستگی خارجی
+
+به‌روزرسانی در مسیر اصلی بدون lock است: هر thread شمارنده‌های خودش را دارد
+(threading.local) و فقط هنگام خواندن /metrics همه جمع زده می‌شوند. lock فقط
+یک بار برای ثبت shard هر thread گرفته می‌شود و وقتی thread تمام شود shard آن
+در یک مجموع بازنشسته ادغام و حذف می‌شود (threadهای کوتاه‌عمر مثل thread pool هر
+دور poller). gaugeها (عمق صف، کش و ...)
+هنگام خواندن از یک تابع محاسبه می‌شوند، پس در مسیر اصلی هزینه‌ای ندارند.
+"""
+
+import time
+import bisect
+import weakref
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DELIVERY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Owner:
+    """فقط در threading.local نگه داشته می‌شود؛ با پایان thread آزاد می‌شود"""
+
+
+class _Sharded:
+    """پایه counter/histogram: یک دیکشنری برچسب‌ها → مقدار برای هر thread"""
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        # مجموع shardهای threadهای تمام شده
+        self._retired = {}
+        self._lock = threading.Lock()
+
+    def _shard(self):
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            owner = self._local.owner = _Owner()
+            weakref.finalize(owner, self._retire, shard)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self._merge(self._retired, shard)
+            self._shards = [s for s in self._shards if s is not shard]
+
+    def _merge(self, total, shard):
+        raise NotImplementedError
+
+    def values(self):
+        with self._lock:
+            shards = list(self._shards)
+            total = self._merge({}, self._retired)
+        for shard in shards:
+            self._merge(total, shard)
+        return total
+
+
+class Counter(_Sharded):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, total, shard):
+        for labels, value in list(shard.items()):
+            total[labels] = total.get(labels, 0) + value
+        return total
+
+    def expose(self):
+        return [f"{self.name}_total{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(self.values().items())]
+
+
+class Histogram(_Sharded):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # شمارش هر bucket (بدون تجمع) + مجموع
+            entry = shard[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def _merge(self, total, shard):
+        for labels, (counts, sum_) in list(shard.items()):
+            merged = total.setdefault(labels, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts)]
+            merged[1] += sum_
+        return total
+
+    def expose(self):
+        lines = []
+        names = self.labelnames + ("le",)
+        for labels, (counts, sum_) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, labels + (_number(bound),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(round(sum_, 6))}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """مقدار لحظه‌ای از fn() هنگام خواندن؛ fn عدد یا دیکشنری برچسب‌ها → عدد برمی‌گرداند"""
+    type = "gauge"
+
+    def __init__(self, name, help, fn, labelnames=(), type="gauge"):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.type = type
+
+    def expose(self):
+        value = self.fn()
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        suffix = "_total" if self.type == "counter" else ""
+        return [f"{self.name}{suffix}{_labels(self.labelnames, k if isinstance(k, tuple) else (k,))} {_number(v)}"
+                for k, v in sorted(items)]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, fn, labelnames=(), type="gauge"):
+        return self.register(Gauge(name, help, fn, labelnames, type))
+
+    def expose(self):
+        """متن قالب Prometheus (text format 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.expose()
+            except Exception as e:
+                print(f"Metrics Error: {metric.name} {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines += samples
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# ─────────────────────────────────────────────────────────────────
+#  متریک‌های upstream (از core.flow)
+# ─────────────────────────────────────────────────────────────────
+
+upstream_latency = registry.histogram(
+    "bot_upstream_request_seconds", "Latency of Telegram / ClickUp API calls", ("upstream", "method"))
+upstream_errors = registry.counter(
+    "bot_upstream_errors", "Failed Telegram / ClickUp API calls by cause", ("upstream", "method", "cause"))
+enrich_timeouts = registry.counter(
+    "bot_enrich_timeouts", "ClickUp lookups abandoned after ENRICH_TIMEOUT", ("fetcher",))
+delivery_latency = registry.histogram(
+    "bot_event_delivery_seconds", "Time from webhook receipt to Telegram delivery", buckets=DELIVERY_BUCKETS)
+processing_errors = registry.counter(
+    "bot_processing_errors", "Events whose processing raised", ("stage",))
+
+
+def clickup_method(path):
+    """مسیر ClickUp → نام کوتاه برای برچسب (GET task / GET comment)"""
+    if path.endswith("/comment"):
+        return "GET comment"
+    if "/task/" in path:
+        return "GET task"
+    return "GET other"
+
+
+def error_cause(error):
+    """دسته خطای کلاینت HTTP: timeout / network / http_4xx / rate_limited / ..."""
+    name = type(error).__name__
+    response = getattr(error, "response", None)
+    if "Timeout" in name or isinstance(error, TimeoutError):
+        return "timeout"
+    if response is not None and name == "HTTPStatusError":
+        return "rate_limited" if response.status_code == 429 else f"http_{response.status_code // 100}xx"
+    if isinstance(error, ValueError):
+        return "bad_response"
+    if type(error).__module__.startswith("httpx") or isinstance(error, OSError):
+        return "network"
+    return "other"
+
+
+def telegram_cause(result):
+    """پاسخ ok=false تلگرام → دسته خطا"""
+    code = result.get("error_code") or 0
+    if code == 429:
+        return "rate_limited"
+    return f"api_{code // 100}xx" if code else "api_error"
+
+
+def timed(upstream, method, call):
+    """اجرای call() با ثبت زمان و خطا"""
+    start = time.perf_counter()
+    try:
+        result = call()
+    except Exception as e:
+        upstream_errors.inc(upstream, method, error_cause(e))
+        raise
+    finally:
+        upstream_latency.observe(time.perf_counter() - start, upstream, method)
+    if upstream == "telegram" and isinstance(result, dict) and not result.get("ok"):
+        upstream_errors.inc(upstream, method, telegram_cause(result))
+    return result
+
+
+async def atimed(upstream, method, call):
+    start = time.perf_counter()
+    try:
+        result = await call()
+    except Exception as e:
+        upstream_errors.inc(upstream, method, error_cause(e))
+        raise
+    finally:
+        upstream_latency.observe(time.perf_counter() - start, upstream, method)
+    if upstream == "telegram" and isinstance(result, dict) and not result.get("ok"):
+        upstream_errors.inc(upstream, method, telegram_cause(result))
+    return result
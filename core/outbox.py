@@ -0,0 +1,305 @@
+"""
+Outbox پایدار (SQLite) برای رویدادها و پیام‌های تلگرام
+
+- رویدادهای پذیرفته شده و پیام‌هایی که ارسالشان شکست خورده در SQLite (WAL) ذخیره می‌شوند
+- نوشتن‌ها بافر می‌شوند و یک thread آن‌ها را گروهی در یک تراکنش commit می‌کند
+- حلقه تحویل ردیف‌های pending را با backoff دوباره اجرا می‌کند
+
+CLI:
+    python -m core.outbox stats
+    python -m core.outbox list [pending|failed|delivered] [limit]
+    python -m core.outbox replay <id>... | --failed
+"""
+
+import os
+import sys
+import time
+import uuid
+import sqlite3
+import threading
+
+from . import codec
+
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.db")
+OUTBOX_COMMIT_INTERVAL = float(os.getenv("OUTBOX_COMMIT_INTERVAL", 0.05))
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", 200))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 5))
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", 120))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", 5))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", 3600))
+OUTBOX_RETENTION_DAYS = float(os.getenv("OUTBOX_RETENTION_DAYS", 7))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+_INSERT = "INSERT OR IGNORE INTO outbox (id, kind, payload, next_attempt, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)"
+_DELIVERED = "UPDATE outbox SET status = 'delivered', updated_at = ? WHERE id = ?"
+# backoff نمایی: base * 2^attempts تا سقف max؛ بعد از max_attempts وضعیت failed
+_RETRY = """
+UPDATE outbox SET
+    attempts = attempts + 1,
+    status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+    next_attempt = ? + min(?, ? * (1 << attempts)),
+    last_error = ?,
+    updated_at = ?
+WHERE id = ?
+"""
+
+
+def connect(path=OUTBOX_PATH):
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class Outbox:
+    """outbox با group commit؛ اگر path خالی باشد غیرفعال است"""
+
+    def __init__(self, path=OUTBOX_PATH):
+        self.path = path
+        self.handler = None
+        self._ops = []
+        self._cond = threading.Condition()
+        self._pid = None
+        self._closed = False
+        # ردیف‌هایی که در همین پروسه در صف یا در حال پردازش‌اند: lease آن‌ها تمدید می‌شود
+        # و حلقه تحویل دوباره سراغشان نمی‌رود
+        self._active = set()
+        self._renewed = 0.0
+        self.commits = 0
+        self.written = 0
+        self.renewals = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def start(self, handler):
+        """
+        handler(kind, payload, row_id) برای ردیف‌های سررسید شده صدا زده می‌شود
+        و باید خودش mark_delivered / mark_retry را صدا بزند. threadها همین‌جا شروع
+        می‌شوند تا ردیف‌های مانده از قبل از ری‌استارت بدون ترافیک جدید هم تحویل شوند
+        (بعد از fork هم اولین _push در worker آن‌ها را دوباره می‌سازد).
+        """
+        self.handler = handler
+        if self.enabled:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._ops = []
+            self._closed = False
+            threading.Thread(target=self._writer, name="outbox-writer", daemon=True).start()
+            threading.Thread(target=self._poller, name="outbox-poller", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _push(self, sql, params):
+        self._ensure_started()
+        with self._cond:
+            self._ops.append((sql, params))
+            if len(self._ops) >= OUTBOX_BATCH:
+                self._cond.notify()
+
+    # ─────────────────────────────────────────────────────────────────
+    #  API
+    # ─────────────────────────────────────────────────────────────────
+
+    def add(self, kind, payload, delay=OUTBOX_LEASE, held=True):
+        """
+        ثبت ردیف جدید - id را فورا برمی‌گرداند (commit گروهی در پس‌زمینه).
+        delay: تا این زمان ردیف در اختیار پردازش جاری است و حلقه تحویل سراغش نمی‌رود
+        held: همین پروسه ردیف را پردازش می‌کند (lease تا mark_* / release تمدید می‌شود)؛
+        False برای ردیف‌هایی که فقط حلقه تحویل باید سراغشان برود
+        """
+        if not self.enabled:
+            return None
+        row_id = uuid.uuid4().hex
+        now = time.time()
+        self._push(_INSERT, (row_id, kind, codec.dumps(payload).decode(), now + delay, now, now))
+        if held:
+            with self._cond:
+                self._active.add(row_id)
+        return row_id
+
+    def release(self, row_id):
+        """ردیف دیگر در این پروسه پردازش نمی‌شود (مثلا صف پر بود) → بعد از lease به حلقه تحویل"""
+        with self._cond:
+            self._active.discard(row_id)
+
+    def mark_delivered(self, row_id):
+        if self.enabled and row_id:
+            self.release(row_id)
+            self._push(_DELIVERED, (time.time(), row_id))
+
+    def mark_retry(self, row_id, error):
+        if self.enabled and row_id:
+            self.release(row_id)
+            now = time.time()
+            self._push(_RETRY, (OUTBOX_MAX_ATTEMPTS, now, OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE,
+                                str(error)[:500], now, row_id))
+
+    def close(self):
+        """commit نهایی بافر"""
+        if self._pid != os.getpid() or self._closed:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._flush(connect(self.path))
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Threads
+    # ─────────────────────────────────────────────────────────────────
+
+    def _flush(self, conn):
+        with self._cond:
+            ops, self._ops = self._ops, []
+        if not ops:
+            return
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for sql, params in ops:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+            self.commits += 1
+            self.written += len(ops)
+        except sqlite3.Error as e:
+            print(f"Outbox Error: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            # دوباره در commit بعدی
+            with self._cond:
+                self._ops[:0] = ops
+
+    def _writer(self):
+        conn = connect(self.path)
+        while not self._closed:
+            with self._cond:
+                if len(self._ops) < OUTBOX_BATCH:
+                    self._cond.wait(OUTBOX_COMMIT_INTERVAL)
+            self._flush(conn)
+
+    def claim_due(self, conn, limit=50):
+        """برداشتن ردیف‌های سررسید شده با lease تا worker دیگری آن‌ها را برندارد"""
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, kind, payload FROM outbox WHERE status = 'pending' AND next_attempt <= ? "
+                "ORDER BY next_attempt LIMIT ?", (now, limit)).fetchall()
+            conn.executemany("UPDATE outbox SET next_attempt = ? WHERE id = ?",
+                             [(now + OUTBOX_LEASE, r[0]) for r in rows])
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _renew_leases(self):
+        """تمدید lease ردیف‌های فعال این پروسه قبل از نصف شدن مهلت (صف طولانی در پشت محدودیت تلگرام)"""
+        now = time.time()
+        if now - self._renewed < OUTBOX_LEASE / 2:
+            return
+        self._renewed = now
+        # زیر همان قفل: mark_retry هم‌زمان بعد از تمدید در صف نوشتن قرار می‌گیرد
+        with self._cond:
+            for row_id in self._active:
+                self._push("UPDATE outbox SET next_attempt = ? WHERE id = ? AND status = 'pending'",
+                           (now + OUTBOX_LEASE, row_id))
+            self.renewals += len(self._active)
+
+    def _poller(self):
+        conn = connect(self.path)
+        last_purge = 0.0
+        while not self._closed:
+            time.sleep(OUTBOX_POLL_INTERVAL)
+            if not self.handler:
+                continue
+            try:
+                self._renew_leases()
+                for row_id, kind, payload in self.claim_due(conn):
+                    with self._cond:
+                        if row_id in self._active:
+                            continue
+                        self._active.add(row_id)
+                    self.handler(kind, codec.loads(payload), row_id)
+                if time.time() - last_purge > 3600:
+                    conn.execute("DELETE FROM outbox WHERE status = 'delivered' AND updated_at < ?",
+                                 (time.time() - OUTBOX_RETENTION_DAYS * 86400,))
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"Outbox Error: {e}")
+
+    def stats(self):
+        return {"enabled": self.enabled, "buffered": len(self._ops), "commits": self.commits, "written": self.written,
+                "active": len(self._active), "lease_renewals": self.renewals}
+
+
+outbox = Outbox()
+
+
+# ─────────────────────────────────────────────────────────────────
+#  CLI
+# ─────────────────────────────────────────────────────────────────
+
+def main(argv):
+    if not OUTBOX_PATH:
+        print("OUTBOX_PATH is empty - outbox disabled")
+        return 1
+    conn = connect()
+    cmd = argv[0] if argv else "stats"
+
+    if cmd == "stats":
+        for status, kind, n in conn.execute(
+                "SELECT status, kind, count(*) FROM outbox GROUP BY status, kind ORDER BY status, kind"):
+            print(f"{status:10} {kind:8} {n}")
+
+    elif cmd == "list":
+        status = argv[1] if len(argv) > 1 else "failed"
+        limit = int(argv[2]) if len(argv) > 2 else 20
+        for row_id, kind, attempts, created, error, payload in conn.execute(
+                "SELECT id, kind, attempts, created_at, last_error, payload FROM outbox "
+                "WHERE status = ? ORDER BY created_at DESC LIMIT ?", (status, limit)):
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created))
+            print(f"{row_id}  {kind:8} attempts={attempts} created={created} error={error or '-'}")
+            print(f"    {payload[:200]}")
+
+    elif cmd == "replay":
+        now = time.time()
+        if argv[1:] == ["--failed"]:
+            cur = conn.execute("UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ?, updated_at = ? "
+                               "WHERE status = 'failed'", (now, now))
+        else:
+            cur = conn.executemany("UPDATE outbox SET status = 'pending', attempts = 0, next_attempt = ?, updated_at = ? "
+                                   "WHERE id = ?", [(now, now, row_id) for row_id in argv[1:]])
+        print(f"{cur.rowcount} rows queued for replay")
+
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,589 @@
+"""
+مسیر کامل پردازش: دریافت webhook → فیلتر → حذف تکراری → صف → parse → دریافت اطلاعات →
+تشخیص تیم → ساخت پیام → ارسال
+
+adapterها (Flask، Vercel، ...) فقط بدنه خام و هدرها را می‌دهند و (status, dict)
+برمی‌گردانند؛ هیچ منطقی در آن‌ها تکرار نمی‌شود.
+"""
+
+import time
+import atexit
+import hmac
+
+from .settings import TEAMS, NOTIFICATIONS, REPORTS, WEBHOOK_SECRET
+from . import codec
+from .body import RequestBody
+from .delivery import delivery_queue
+from .cache import task_cache, team_cache, album_cache, invalidate_task, TASK_CHANGE_EVENTS
+from .ratelimit import telegram_scheduler, clickup_governor, PRIORITY_HIGH, PRIORITY_LOW
+from .singleflight import clickup_flight
+from .coalesce import Coalescer, COALESCE_WINDOW
+from .digest import TeamDigest
+from .reports import ReportAggregator, EVENT_METRICS
+from .outbox import outbox
+from .poller import Poller
+from .dedupe import idempotency, event_key
+from .cursor import comment_cursors
+from .events import parse_event, needs_task, get_username, comment_event
+from .filters import IngressFilter
+from .dates import fmt
+from .clickup import (get_new_comments, get_task, get_images_from_comment, get_text_from_comment,
+                      team_router, get_team_from_task)
+from .render import (build_comment_message, build_activity_message, build_comment_keyboard,
+                     build_test_message, build_digest_messages, build_report_message,
+                     CHANGE_TITLES, describe_change)
+from .media import file_ids
+from .telegram import (make_request, send_telegram, send_photo, send_album, forward_album,
+                       edit_message_reply_markup, inline_request, message_params, callback_query_params)
+from .flow import Gather, blocking
+from .metrics import registry, delivery_latency, processing_errors
+
+# فیلتر رویدادها - یک بار از NOTIFICATIONS و تنظیمات تیم‌ها ساخته می‌شود
+ingress_filter = IngressFilter(NOTIFICATIONS, TEAMS)
+
+# صف تحویل پس‌زمینه: threadها (WSGI) یا event loop (asgi.py با use_delivery)
+delivery = delivery_queue
+
+def use_delivery(queue):
+    global delivery
+    delivery = queue
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  📥 دریافت webhook ClickUp
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def webhook_body():
+    """بدنه خالی برای خواندن تدریجی توسط adapter (HMAC هم‌زمان با خواندن)"""
+    return RequestBody(WEBHOOK_SECRET)
+
+
+def _as_body(body):
+    return body if isinstance(body, RequestBody) else RequestBody.of(body, WEBHOOK_SECRET)
+
+
+def verify_signature(body, signature):
+    if not WEBHOOK_SECRET:
+        return True
+    if not signature:
+        return False
+    return hmac.compare_digest(signature, _as_body(body).hexdigest(WEBHOOK_SECRET))
+
+
+def decode(body):
+    """بدنه خام → dict یا None (JSON نامعتبر / غیر dict)"""
+    try:
+        data = codec.loads(body) if body else {}
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def receive_clickup_webhook(body, signature=None, background=True, data=None):
+    """
+    بدنه خام webhook (bytes یا RequestBody) → (status_code, پاسخ).
+    background=False برای سرورلس: پردازش همین‌جا انجام می‌شود چون بعد از پاسخ
+    thread پس‌زمینه‌ای باقی نمی‌ماند (بدون outbox و پنجره ادغام).
+    data: بدنه از قبل decode شده، تا دوباره parse نشود
+    """
+    received = time.monotonic()
+    body = _as_body(body)
+    if body.too_large:
+        return 413, {"error": "Payload Too Large"}
+    if not verify_signature(body, signature):
+        return 401, {"error": "Unauthorized"}
+    
+    raw = body.raw
+    data = data if data is not None else decode(raw)
+    if data is None:
+        return 400, {"error": "Bad Request"}
+    
+    is_event = "payload" in data or "event" in data
+    
+    # رویدادهای غیرفعال قبل از هر درخواست شبکه حذف می‌شوند
+    if is_event and not ingress_filter.accept(data):
+        return 200, {"status": "ignored"}
+    
+    # ارسال دوباره ClickUp (بعد از timeout) → پاسخ فوری بدون هیچ درخواست خروجی
+    key = event_key(data, raw) if is_event else None
+    if idempotency.seen(key):
+        return 200, {"status": "duplicate"}
+    
+    if not (is_event or "body" in data):
+        return 200, {"status": "ok"}
+    
+    if not background:
+        try:
+            handle_task_events([data])
+        except Exception:
+            processing_errors.inc("inline")
+            idempotency.forget(key)
+            raise
+        delivery_latency.observe(time.monotonic() - received)
+        return 200, {"status": "ok"}
+    
+    # فقط صف‌بندی؛ دریافت اطلاعات و ارسال به تلگرام در پس‌زمینه انجام می‌شود
+    # ثبت در outbox تا با ری‌استارت worker از دست نرود
+    row_id = outbox.add("event", data) if "body" not in data else None
+    task_id = (data.get("payload") or {}).get("id") or data.get("task_id")
+    if task_id and coalescer.enabled:
+        accepted = coalescer.add(task_id, (data, row_id, received))
+    else:
+        accepted = delivery.submit(process_clickup_events, [(data, row_id, received)])
+    if not accepted:
+        if not row_id:
+            idempotency.forget(key)
+            return 503, {"error": "Busy"}
+        # صف پر است ولی رویداد در outbox ثبت شده → حلقه تحویل بعد از lease آن را برمی‌دارد
+        outbox.release(row_id)
+        print("Delivery queue full, event left in outbox")
+    
+    return 200, {"status": "ok"}
+
+
+def receive_polled_comments(task, comments):
+    """
+    کامنت‌های جدید یک تسک از core.poller → همان مسیر رویدادهای webhook.
+    همین‌جا (در thread poller) پردازش می‌شود تا هم‌زمانی با POLL_CONCURRENCY محدود بماند.
+    """
+    events = [e for e in (comment_event(task, c) for c in comments) if ingress_filter.accept(e)]
+    if events:
+        handle_task_events(events)
+
+
+def flush_task_events(task_id, items):
+    """رویدادهای ادغام شده یک تسک → صف تحویل"""
+    if not delivery.submit(process_clickup_events, items):
+        process_clickup_events(items)
+
+coalescer = Coalescer(COALESCE_WINDOW, flush_task_events)
+
+
+def flush_team_digest(team_key, texts):
+    """خلاصه پیام‌های یک تیم → صف تحویل"""
+    if not delivery.submit(send_team_digest, team_key, texts):
+        send_team_digest(team_key, texts)
+
+@blocking
+def send_team_digest(team_key, texts):
+    team = TEAMS[team_key]
+    for part in build_digest_messages(team, texts):
+        yield from send_telegram.flow(part, team["chat_id"], durable=True)
+
+team_digest = TeamDigest(TEAMS, flush_team_digest)
+
+
+def send_report(name, first, last, totals, top_tasks, top_users):
+    """گزارش سررسید شده → چت ادمین (از thread زمان‌بند گزارش‌ها)"""
+    send_telegram(build_report_message(name, first, last, totals, top_tasks, top_users, TEAMS), durable=True)
+
+reports = ReportAggregator(REPORTS)
+reports.start(send_report)
+
+
+def handle_outbox_row(kind, payload, row_id):
+    """ردیف سررسید شده outbox → صف تحویل (صف پر → بعد از lease دوباره)"""
+    if kind == "event":
+        submitted = delivery.submit(process_clickup_events, [(payload, row_id, None)])
+    elif kind == "message":
+        submitted = delivery.submit(deliver_outbox_message, payload, row_id)
+    else:
+        submitted = False
+    if not submitted:
+        outbox.release(row_id)
+
+@blocking
+def deliver_outbox_message(payload, row_id):
+    if (yield from make_request.flow(payload["method"], payload["params"])):
+        outbox.mark_delivered(row_id)
+    else:
+        outbox.mark_retry(row_id, f"{payload['method']} failed")
+
+outbox.start(handle_outbox_row)
+
+poller = Poller()
+poller.start(receive_polled_comments)
+
+
+def flush_buffers():
+    """flush فوری پنجره ادغام و خلاصه تیم‌ها (هنگام خاموش شدن)"""
+    coalescer.flush_all()
+    team_digest.flush_all()
+
+def close_stores():
+    """checkpoint نهایی گزارش‌ها و commit نهایی outbox"""
+    reports.close()
+    outbox.close()
+
+def shutdown():
+    """خاموش شدن مرتب: پنجره ادغام و خلاصه‌ها → صف تحویل → commit نهایی فایل‌ها"""
+    flush_buffers()
+    delivery.shutdown()
+    close_stores()
+
+atexit.register(shutdown)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  ⚙️ پردازش رویداد
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@blocking
+def process_clickup_events(items):
+    """
+    پردازش یک یا چند رویداد ClickUp به شکل (data, outbox_row_id, زمان دریافت) در
+    worker پس‌زمینه. ردیف‌های outbox بعد از پردازش delivered می‌شوند؛ پیام‌هایی که
+    ارسالشان شکست خورده جداگانه در outbox مانده‌اند.
+    """
+    try:
+        yield from handle_task_events.flow([data for data, _, _ in items])
+    except Exception as e:
+        processing_errors.inc("background")
+        for _, row_id, _ in items:
+            outbox.mark_retry(row_id, e)
+        raise
+    now = time.monotonic()
+    for _, row_id, received in items:
+        outbox.mark_delivered(row_id)
+        # ردیف‌های بازیابی شده از outbox زمان دریافت ندارند
+        if received is not None:
+            delivery_latency.observe(now - received)
+
+
+@blocking
+def handle_task_events(events):
+    """
+    رویدادهای یک تسک (یک یا چند رویداد ادغام شده) → یک بار دریافت اطلاعات و یک پیام.
+    پیام تا جای ممکن از خود payload (event و history_items) ساخته می‌شود و فقط
+    داده‌هایی که واقعا در payload نیستند از ClickUp گرفته می‌شوند.
+    """
+    data = events[-1]
+    if "body" in data and "payload" not in data and "event" not in data:
+        yield from send_telegram.flow(f"🧪 **تست Webhook**\n\n✅ سرور فعال است!\n\n🕐 {fmt(None)}")
+        return
+    
+    parsed = [parse_event(e) for e in events if "payload" in e or "event" in e]
+    if not parsed:
+        return
+    task_id = parsed[-1]["task_id"]
+    
+    # تغییر تسک → کش آن باطل شود؛ کامنت‌ها از کش می‌خوانند
+    if task_id and any(p["event"] in TASK_CHANGE_EVENTS for p in parsed):
+        invalidate_task(task_id)
+    
+    # فقط داده‌های ناموجود: تسک (نام / فیلد تیم) و برای فرمت automation کامنت‌های بعد از cursor
+    # سهمیه ClickUp: تسک رویدادهای کامنت قبل از فعالیت‌های دیگر
+    priority = PRIORITY_HIGH if any(p["kind"] in ("comment", "legacy") for p in parsed) else PRIORITY_LOW
+    fetchers = {}
+    if task_id and needs_task(parsed, route_all=ingress_filter.has_team_overrides):
+        fetchers["task"] = get_task.flow(task_id, priority)
+    if task_id and any(p["kind"] == "legacy" for p in parsed):
+        fetchers["comments"] = get_new_comments.flow(task_id, comment_cursors.get(task_id))
+    extra = (yield Gather(fetchers)) if fetchers else {}
+    # cursor: کامنت‌های webhook فقط آن را جلو می‌برند؛ کامنت‌های دریافتی فقط اگر هنوز اعلام نشده‌اند
+    comment_cursors.claim(task_id, [p["comment"] for p in parsed if p["kind"] == "comment" and p["comment"]],
+                          skip_older=False)
+    fetched = comment_cursors.claim(task_id, extra.get("comments") or [])
+    
+    task_data = extra.get("task") or next((p["task"] for p in reversed(parsed) if p["task"]), None)
+    task_name = next((p["task_name"] for p in reversed(parsed) if p["task_name"]), None) \
+        or (task_data or {}).get("name", "?")
+    
+    # تشخیص تیم و اعمال تنظیمات اعلان اختصاصی آن
+    team_key, team_config = get_team_from_task(task_data)
+    record_activity(parsed, fetched, team_key, task_id, task_name)
+    # تکمیل تسک با اعلان تکمیل خاموش → تغییر وضعیت معمولی
+    for p in parsed:
+        p["kind"] = ingress_filter.allowed_kind(p["kind"], team_key)
+    parsed = [p for p in parsed if p["kind"]]
+    
+    comments = [p["comment"] for p in parsed if p["kind"] == "comment" and p["comment"]]
+    if ingress_filter.allows("comment", team_key):
+        comments += fetched
+    changes = [p for p in parsed if p["kind"] not in ("comment", "legacy")]
+    if not comments:
+        # automation بدون کامنت → فعالیت عمومی مثل قبل
+        changes += [p for p in parsed if p["kind"] == "legacy"]
+    lines = [line for line in map(describe_change, changes) if line]
+    
+    if comments:
+        for i, comment in enumerate(comments):
+            yield from send_comment_notification.flow(task_name, task_id, comment, team_key, team_config,
+                                                      extra_lines=lines if i == len(comments) - 1 else ())
+    elif changes:
+        # فعالیت جدید (بدون کامنت) - فقط به ادمین
+        last = changes[-1]
+        title = CHANGE_TITLES.get(last["kind"], "🔔 **فعالیت جدید**") if len(changes) == 1 else "🔔 **فعالیت جدید**"
+        username = next((p["username"] for p in reversed(changes) if p["username"]), None)
+        msg = build_activity_message(task_name, task_id, title=title, lines=lines,
+                                     username=username, date=last["date"])
+        yield from send_telegram.flow(msg, durable=True)
+
+
+def record_activity(parsed, legacy_comments, team_key, task_id, task_name):
+    """شمارنده‌های گزارش (کامنت، تغییر وضعیت، تکمیل) برای تیم، تسک و کاربر"""
+    if not reports.enabled:
+        return
+    for p in parsed:
+        for metric in EVENT_METRICS.get(p["kind"], ()):
+            reports.record(metric, team_key, task_id, task_name, p["username"])
+    for comment in legacy_comments:
+        reports.record("comments", team_key, task_id, task_name, get_username(comment.get("user")))
+
+
+@blocking
+def send_comment_notification(task_name, task_id, comment, team_key, team_config, extra_lines=()):
+    """ارسال کامنت جدید به ادمین با دکمه‌های ارسال به تیم"""
+    username = get_username(comment.get("user"))
+    images = get_images_from_comment(comment)
+    comment_text = get_text_from_comment(comment)
+    
+    if not comment_text and images:
+        comment_text = "📷 تصویر"
+    
+    msg = build_comment_message(
+        task_name, task_id, comment_text, username,
+        comment.get('date'), team_config, extra_lines
+    )
+    
+    # دکمه‌های ارسال
+    reply_markup = build_comment_keyboard(team_key, team_config)
+    
+    # ارسال به ادمین (همیشه) - چند عکس در قالب یک آلبوم
+    if len(images) > 1:
+        yield from send_album.flow(images, msg, reply_markup=reply_markup, durable=True)
+    elif images:
+        yield from send_photo.flow(images[0], msg, reply_markup=reply_markup, durable=True)
+    else:
+        yield from send_telegram.flow(msg, reply_markup=reply_markup, durable=True)
+    
+    # ❌ ارسال خودکار به تیم حذف شد (طبق فلو جدید)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  🤖 آپدیت‌های تلگرام (دکمه‌ها و ریپلای‌ها)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@blocking
+def receive_telegram_update(body, background=True):
+    """بدنه خام آپدیت تلگرام (bytes یا RequestBody) → (status_code, پاسخ)"""
+    if not isinstance(body, RequestBody):
+        body = RequestBody.of(body)
+    if body.too_large:
+        return 413, {"error": "Payload Too Large"}
+    return (yield from handle_telegram_update.flow(decode(body.raw), background))
+
+
+@blocking
+def handle_telegram_update(update, background=True):
+    """
+    آپدیت تلگرام → (status_code, پاسخ).
+    فوری‌ترین فراخوانی (معمولا answerCallbackQuery) در خود پاسخ webhook برگردانده
+    می‌شود و بقیه در صف تحویل ارسال می‌شوند؛ background=False برای سرورلس.
+    """
+    if not update:
+        return 200, {"status": "no data"}
+
+    # 1. هندل کردن دکمه‌ها (Callback Query)
+    if "callback_query" in update:
+        return (yield from handle_callback_query.flow(update["callback_query"], background))
+
+    # 2. هندل کردن پیام‌های ریپلای شده (Message)
+    if "message" in update:
+        reply = yield from handle_edit_reply.flow(update["message"], background)
+        if reply:
+            return 200, reply
+
+    return 200, {"status": "ok"}
+
+
+def _later(fn, *args, background=True):
+    """ارسال غیر فوری در صف تحویل؛ اگر صف نبود یا پر بود همین‌جا"""
+    if background and delivery.submit(fn, *args):
+        return
+    yield from fn.flow(*args)
+
+
+@blocking
+def send_message_to_team(team, message):
+    """پیام ادمین (متن، عکس یا پیام کنترلی آلبوم) → گروه تیم"""
+    text_to_send = message.get("text") or message.get("caption")
+    # اگر عکس بود - بزرگترین سایز؛ تلگرام file_id را در sendPhoto قبول می‌کند
+    photo = message.get("photo")
+    # پیام کنترلی آلبوم → ارسال کل آلبوم
+    album = message.get("reply_to_message") or {}
+    if album.get("media_group_id") and album.get("photo"):
+        return (yield from forward_album.flow(album, team["chat_id"]))
+    if photo:
+        return (yield from send_photo.flow(photo[-1]["file_id"], text_to_send, team["chat_id"]))
+    return (yield from send_telegram.flow(text_to_send, team["chat_id"]))
+
+
+@blocking
+def forward_to_team(team_key, message):
+    """
+    ارسال تایید شده در صف تحویل (بعد از پاسخ دکمه): موفق → حذف دکمه‌ها،
+    ناموفق → دکمه‌ها می‌مانند و ادمین با یک پاسخ به همان پیام خبردار می‌شود.
+    """
+    team = TEAMS[team_key]
+    chat_id = message["chat"]["id"]
+    if (yield from send_message_to_team.flow(team, message)):
+        yield from edit_message_reply_markup.flow(chat_id, message["message_id"])
+    else:
+        yield from make_request.flow("sendMessage", {
+            "chat_id": chat_id,
+            "text": f"❌ ارسال به تیم {team.get('name', team_key)} انجام نشد - دوباره تلاش کنید",
+            "reply_to_message_id": message["message_id"],
+        })
+
+
+@blocking
+def handle_callback_query(cb, background=True):
+    cb_id = cb["id"]
+    data = cb.get("data", "")
+    message = cb.get("message", {})
+    chat_id = message.get("chat", {}).get("id")
+    message_id = message.get("message_id")
+    
+    # تشخیص اکشن و تیم
+    if ":" not in data:
+        return 200, {"status": "ok"}
+    action, team_key = data.split(":", 1)
+    team = TEAMS.get(team_key)
+    
+    if not team:
+        return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "❌ تیم یافت نشد"))
+
+    if action == "send":
+        # ارسال مستقیم متن موجود به تیم
+        text_to_send = message.get("text") or message.get("caption")
+        album = message.get("reply_to_message") or {}
+        is_media = message.get("photo") or (album.get("media_group_id") and album.get("photo"))
+        if not is_media and background and team_digest.add(team_key, text_to_send):
+            # تیم در حالت خلاصه - متن در پیام ترکیبی بعدی می‌رود
+            yield from _later(edit_message_reply_markup, chat_id, message_id, background=background)
+            return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "🗂 به خلاصه تیم اضافه شد"))
+        
+        # پاسخ دکمه فورا برمی‌گردد؛ ارسال به تیم و حذف دکمه‌ها در صف تحویل
+        if background and delivery.submit(forward_to_team, team_key, message):
+            return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "📤 در حال ارسال..."))
+        
+        # سرورلس یا صف پر → همین‌جا، و متن پاسخ دکمه به نتیجه آن بستگی دارد
+        if not (yield from send_message_to_team.flow(team, message)):
+            return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "❌ خطا در ارسال"))
+        yield from _later(edit_message_reply_markup, chat_id, message_id, background=background)
+        return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "✅ ارسال شد"))
+
+    if action == "edit":
+        # درخواست متن جدید از ادمین (ForceReply)
+        # چون دیتابیس نداریم team_key در متن پیام می‌آید و در هندلر ریپلای پیدا می‌شود
+        team_name = team.get("name")
+        force_reply = {
+            "force_reply": True,
+            "input_field_placeholder": f"متن برای {team_name}..."
+        }
+        prompt_msg = f"✍️ متن ویرایش شده برای تیم **{team_name}** را در پاسخ به این پیام بنویسید.\n\n(ID: {team_key})"
+        
+        yield from _later(make_request, "sendMessage", {
+            "chat_id": chat_id,
+            "text": prompt_msg,
+            "reply_markup": force_reply
+        }, background=background)
+        return 200, inline_request("answerCallbackQuery", callback_query_params(cb_id, "📝 منتظر متن جدید..."))
+
+    return 200, {"status": "ok"}
+
+
+@blocking
+def handle_edit_reply(msg, background=True):
+    """
+    ریپلای ادمین به پیام «متن ویرایش شده» → ارسال متن جدید به تیم.
+    پیام تایید به ادمین به شکل پاسخ webhook برگردانده می‌شود.
+    """
+    reply = msg.get("reply_to_message")
+    if not (reply and "text" in reply):
+        return None
+    reply_text = reply["text"]
+    # چک کردن الگوی پیام ما
+    if "متن ویرایش شده برای تیم" not in reply_text or "ID:" not in reply_text:
+        return None
+    # استخراج team_key - فرمت: ... (ID: team_key)
+    try:
+        team_key = reply_text.split("(ID: ")[1].split(")")[0]
+    except IndexError:
+        return None
+    new_text = msg.get("text")
+    team = TEAMS.get(team_key)
+    if not (team and new_text):
+        return None
+    if background and team_digest.add(team_key, new_text):
+        text = "🗂 پیام ویرایش شده به خلاصه تیم اضافه شد."
+    elif (yield from send_telegram.flow(new_text, team["chat_id"])):
+        text = "✅ پیام ویرایش شده با موفقیت ارسال شد."
+    else:
+        text = "❌ خطا در ارسال به تیم."
+    return inline_request("sendMessage", message_params(text, msg["chat"]["id"]))
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+#  🧪 تست و آمار
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@blocking
+def send_test_message():
+    """پیام تست سرور → تعداد تیم‌های فعال"""
+    msg, active = build_test_message(TEAMS)
+    yield from send_telegram.flow(msg)
+    return active
+
+
+def _cache_stats(key):
+    caches = {"task": task_cache, "team": team_cache, "album": album_cache}
+    return lambda: {name: cache.stats()[key] for name, cache in caches.items()}
+
+registry.gauge("bot_queue_depth", "Pending background jobs", lambda: delivery.depth())
+registry.gauge("bot_coalesce_pending_tasks", "Tasks waiting in the coalesce window", lambda: coalescer.depth())
+registry.gauge("bot_outbox_buffered", "Outbox writes waiting for commit", lambda: outbox.stats()["buffered"])
+registry.gauge("bot_cache_hits", "Cache hits", _cache_stats("hits"), ("cache",), type="counter")
+registry.gauge("bot_cache_misses", "Cache misses", _cache_stats("misses"), ("cache",), type="counter")
+registry.gauge("bot_cache_hit_ratio", "Cache hit ratio since start", _cache_stats("hit_ratio"), ("cache",))
+registry.gauge("bot_telegram_throttled", "Sends delayed by the Telegram rate limiter",
+               lambda: telegram_scheduler.throttled, type="counter")
+registry.gauge("bot_telegram_retried", "Sends retried after a Telegram 429",
+               lambda: telegram_scheduler.retried, type="counter")
+registry.gauge("bot_clickup_remaining", "ClickUp requests left in the current rate-limit window",
+               lambda: {} if clickup_governor.stats()["remaining"] is None else clickup_governor.stats()["remaining"])
+registry.gauge("bot_clickup_waits", "ClickUp requests that waited for budget",
+               lambda: {"high": clickup_governor.waits[PRIORITY_HIGH], "low": clickup_governor.waits[PRIORITY_LOW]},
+               ("priority",), type="counter")
+registry.gauge("bot_clickup_requests", "ClickUp lookups sent upstream vs. served by an in-flight request",
+               lambda: {"sent": clickup_flight.calls, "shared": clickup_flight.shared}, ("result",), type="counter")
+registry.gauge("bot_dedupe_duplicates", "Webhook redeliveries dropped",
+               lambda: idempotency.duplicates, type="counter")
+
+
+def metrics():
+    """متن /metrics برای Prometheus"""
+    return registry.expose()
+
+
+def stats():
+    """آمار کش و صف برای تنظیم اندازه‌ها"""
+    return {
+        "queue_depth": delivery.depth(),
+        "coalesce": {"window": coalescer.window, "pending_tasks": coalescer.depth(), "merged_events": coalescer.merged},
+        "digest": team_digest.stats(),
+        "reports": reports.stats(),
+        "outbox": outbox.stats(),
+        "dedupe": idempotency.stats(),
+        "poller": poller.stats(),
+        "comment_cursors": comment_cursors.stats(),
+        "notifications": ingress_filter.stats(),
+        "task_cache": task_cache.stats(),
+        "team_cache": team_cache.stats(),
+        "telegram_file_ids": file_ids.stats(),
+        "team_index_rebuilds": team_router.rebuilds,
+        "telegram_scheduler": telegram_scheduler.stats(),
+        "clickup_governor": clickup_governor.stats(),
+        "clickup_singleflight": clickup_flight.stats(),
+    }
@@ -0,0 +1,223 @@
+"""
+حالت polling: جایگزین webhook برای کامنت‌های جدید
+
+هر POLL_INTERVAL ثانیه برای هر workspace فقط تسک‌هایی که بعد از watermark تغییر
+کرده‌اند (date_updated_gt، قدیمی‌ترین اول) صفحه به صفحه خوانده می‌شوند و برای هر
+کدام فقط کامنت‌های بعد از cursor آن تسک (core.cursor) با حداکثر POLL_CONCURRENCY
+درخواست هم‌زمان دریافت می‌شود. پس هزینه هر دور به تعداد تغییرات بستگی دارد نه
+اندازه workspace. خروجی همان مسیر پیام‌های webhook است (handler در core.pipeline:
+receive_polled_comments).
+
+صفحه‌ها keyset هستند (date_updated_gt = بزرگ‌ترین date_updated صفحه قبل) و
+watermark بعد از پردازش هر صفحه در POLL_STATE_DB ذخیره می‌شود؛ دور بعد (یا بعد از
+ری‌استارت) از همان‌جا ادامه می‌دهد. اولین اجرا فقط watermark را روی «الان» می‌گذارد.
+
+CLI:
+    python -m core.poller            # هر POLL_INTERVAL ثانیه
+    python -m core.poller --once     # یک دور (مثلا cron در GitHub Actions)
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .flow import run
+from .clickup import get_updated_tasks, get_new_comments, TASK_PAGE_SIZE
+from .cursor import comment_cursors
+from .ratelimit import PRIORITY_LOW
+
+POLL_TEAM_IDS = [t.strip() for t in os.getenv("POLL_TEAM_IDS", os.getenv("CLICKUP_TEAM_ID", "")).split(",") if t.strip()]
+POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", 300))
+POLL_CONCURRENCY = int(os.getenv("POLL_CONCURRENCY", 4))
+POLL_STATE_DB = os.getenv("POLL_STATE_DB", "poll_state.db")
+# thread پس‌زمینه در سرور (app.py / asgi.py)؛ پیش‌فرض خاموش - CLI جداگانه اجرا شود
+POLL_BACKGROUND = os.getenv("POLL_BACKGROUND", "0") == "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_state (
+    team_id TEXT PRIMARY KEY,
+    updated_gt INTEGER,
+    lease_until REAL NOT NULL DEFAULT 0,
+    polled_at REAL
+)
+"""
+
+
+def task_updated(task):
+    try:
+        return int(task.get("date_updated") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class Poller:
+    """watermark هر workspace در SQLite و یک دور polling با هم‌زمانی محدود"""
+
+    def __init__(self, team_ids=POLL_TEAM_IDS, interval=POLL_INTERVAL, concurrency=POLL_CONCURRENCY,
+                 path=POLL_STATE_DB):
+        self.team_ids = list(team_ids)
+        self.interval = interval
+        self.concurrency = max(1, concurrency)
+        self.path = path
+        self.handler = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self.cycles = 0
+        self.tasks = 0
+        self.comments = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return bool(self.team_ids and self.path)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # ─────────────────────────────────────────────────────────────────
+    #  watermark
+    # ─────────────────────────────────────────────────────────────────
+
+    def watermark(self, team_id):
+        row = self._conn().execute("SELECT updated_gt FROM poll_state WHERE team_id = ?", (team_id,)).fetchone()
+        return row[0] if row else None
+
+    def save_watermark(self, team_id, updated_gt):
+        self._conn().execute("INSERT INTO poll_state (team_id, updated_gt, polled_at) VALUES (?, ?, ?) "
+                             "ON CONFLICT (team_id) DO UPDATE SET updated_gt = excluded.updated_gt, "
+                             "polled_at = excluded.polled_at", (team_id, updated_gt, time.time()))
+
+    def _lease(self, team_id):
+        """چند worker یا پروسه: در هر POLL_INTERVAL فقط یکی این workspace را poll می‌کند"""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO poll_state (team_id) VALUES (?)", (team_id,))
+        return conn.execute("UPDATE poll_state SET lease_until = ? WHERE team_id = ? AND lease_until <= ?",
+                            (now + self.interval * 0.9, team_id, now)).rowcount == 1
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Polling
+    # ─────────────────────────────────────────────────────────────────
+
+    def poll_once(self, force=False):
+        """یک دور برای همه workspaceها → تعداد تسک‌های تغییر کرده"""
+        total = 0
+        for team_id in self.team_ids:
+            try:
+                if force or self._lease(team_id):
+                    total += self.poll_team(team_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"Poller Error: team {team_id} {e}")
+        self.cycles += 1
+        return total
+
+    def poll_team(self, team_id):
+        since = self.watermark(team_id)
+        if since is None:
+            # اولین اجرا: تاریخچه قبلی اعلام نمی‌شود
+            self.save_watermark(team_id, int(time.time() * 1000))
+            return 0
+
+        floor, edge, count = since, set(), 0
+        inflight, mark = [], since
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="poller") as pool:
+            try:
+                while True:
+                    # تسک‌های هم‌زمان با مرز صفحه قبل (همان ms) دوباره خوانده و رد می‌شوند
+                    tasks, last = run(get_updated_tasks.flow(team_id, since - 1 if edge else since))
+                    fresh = [t for t in tasks if not (task_updated(t) == since and t.get("id") in edge)]
+                    # صفحه بعد هم‌زمان با پردازش صفحه قبل گرفته شد؛ حالا watermark آن ذخیره می‌شود
+                    self._finish(team_id, inflight, mark)
+                    inflight = []
+                    if not fresh:
+                        break
+                    inflight = [pool.submit(self.process_task, t, floor) for t in fresh]
+                    mark = max(map(task_updated, fresh))
+                    edge = {t.get("id") for t in fresh if task_updated(t) == mark} | (edge if mark == since else set())
+                    since = mark
+                    count += len(fresh)
+                    if last or len(tasks) < TASK_PAGE_SIZE:
+                        break
+            finally:
+                # خطای صفحه بعد: کار صفحه در حال پردازش از دست نرود
+                self._finish(team_id, inflight, mark)
+        self.tasks += count
+        return count
+
+    def _finish(self, team_id, futures, mark):
+        for future in futures:
+            future.result()
+        if futures:
+            self.save_watermark(team_id, mark)
+
+    def process_task(self, task, floor):
+        """
+        کامنت‌های جدید یک تسک → پیام. تسکی که cursor ندارد از watermark شروع دور
+        (floor) مقایسه می‌شود تا کامنت‌های قدیمی‌تر اعلام نشوند.
+        """
+        task_id = task.get("id")
+        try:
+            cursor = comment_cursors.get(task_id) or (None, floor)
+            comments = comment_cursors.claim(task_id, run(get_new_comments.flow(task_id, cursor, priority=PRIORITY_LOW)))
+            if comments:
+                self.comments += len(comments)
+                self.handler(task, comments)
+        except Exception as e:
+            self.errors += 1
+            print(f"Poller Error: task {task_id} {e}")
+
+    # ─────────────────────────────────────────────────────────────────
+    #  Thread
+    # ─────────────────────────────────────────────────────────────────
+
+    def start(self, handler):
+        """
+        handler(task, comments) کامنت‌های جدید هر تسک را ارسال می‌کند. thread پس‌زمینه
+        فقط با POLL_BACKGROUND=1، و مثل outbox بعد از fork در همان worker ساخته می‌شود.
+        """
+        self.handler = handler
+        if not (POLL_BACKGROUND and self.enabled) or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._local = threading.local()
+            threading.Thread(target=self.run_forever, name="poller", daemon=True).start()
+            self._pid = os.getpid()
+
+    def run_forever(self):
+        while True:
+            started = time.monotonic()
+            self.poll_once()
+            time.sleep(max(1.0, self.interval - (time.monotonic() - started)))
+
+    def stats(self):
+        return {"enabled": self.enabled, "background": POLL_BACKGROUND, "teams": len(self.team_ids),
+                "cycles": self.cycles, "tasks": self.tasks, "comments": self.comments, "errors": self.errors}
+
+
+def main(argv):
+    # همان نمونه core.pipeline که handler آن تنظیم شده است
+    from .pipeline import poller
+    if not poller.enabled:
+        sys.exit("POLL_TEAM_IDS (یا CLICKUP_TEAM_ID) تنظیم نشده است")
+    if "--once" in argv:
+        tasks = poller.poll_once(force=True)
+        print(f"Poll: {tasks} updated tasks, {poller.comments} comments, {poller.errors} errors")
+    else:
+        poller.run_forever()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
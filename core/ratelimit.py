@@ -0,0 +1,313 @@
+"""
+زمان‌بند ارسال به تلگرام با token bucket سراسری و یک bucket برای هر چت
+
+محدودیت‌های تلگرام: حدود ۳۰ پیام در ثانیه در کل، ۱ پیام در ثانیه برای هر چت
+خصوصی و ۲۰ پیام در دقیقه برای هر گروه. پاسخ 429 (retry_after) رعایت می‌شود
+و ترتیب پیام‌های هر چت حفظ می‌شود.
+
+ClickUpGovernor همین کار را برای ClickUp API (حدود ۱۰۰ درخواست در دقیقه برای هر
+توکن) انجام می‌دهد: سرعت از هدرهای X-RateLimit-Remaining / Reset تنظیم می‌شود،
+درخواست‌ها هنگام کمبود سهمیه صبر می‌کنند (نه اینکه شکست بخورند) و چند درخواست
+آخر پنجره برای کامنت‌ها نگه داشته می‌شود.
+"""
+
+import os
+import time
+import threading
+
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", 30))
+TG_CHAT_RATE = float(os.getenv("TG_CHAT_RATE", 1))
+TG_GROUP_RATE_PER_MIN = float(os.getenv("TG_GROUP_RATE_PER_MIN", 20))
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", 3))
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", 3))
+
+CLICKUP_RATE_PER_MIN = float(os.getenv("CLICKUP_RATE_PER_MIN", 100))
+CLICKUP_BURST = float(os.getenv("CLICKUP_BURST", 10))
+CLICKUP_RESERVE = int(os.getenv("CLICKUP_RESERVE", 10))
+CLICKUP_MAX_RETRIES = int(os.getenv("CLICKUP_MAX_RETRIES", 3))
+CLICKUP_MAX_WAIT = float(os.getenv("CLICKUP_MAX_WAIT", 120))
+
+# اولویت درخواست‌های ClickUp: کامنت (و تسک آن) قبل از فعالیت‌های کم‌اهمیت
+PRIORITY_HIGH = 0
+PRIORITY_LOW = 1
+
+
+class TokenBucket:
+    """token bucket با رزرو؛ reserve زمان انتظار لازم را برمی‌گرداند"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def pause(self, seconds):
+        """توقف bucket (مثلا بعد از 429)"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def backlog(self):
+        """انتظار درخواست بعدی اگر همین حالا رزرو شود (بدون رزرو)"""
+        with self._lock:
+            now = time.monotonic()
+            tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate) - 1
+            wait = -tokens / self.rate if tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+
+class _ChatLane:
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.cond = threading.Condition()
+        self.next_ticket = 0
+        self.serving = 0
+        # نوبت در حالت async (asyncio.Lock به ترتیب ورود آزاد می‌شود)
+        self.alock = None
+
+
+class TelegramScheduler:
+    """صف نوبتی برای هر چت + محدودیت سراسری"""
+
+    def __init__(self, global_rate=TG_GLOBAL_RATE, chat_rate=TG_CHAT_RATE,
+                 group_rate=TG_GROUP_RATE_PER_MIN / 60, burst=TG_CHAT_BURST,
+                 max_retries=TG_MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self._lanes = {}
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.retried = 0
+
+    def _lane(self, chat_id):
+        key = str(chat_id)
+        lane = self._lanes.get(key)
+        if lane is None:
+            with self._lock:
+                lane = self._lanes.get(key)
+                if lane is None:
+                    # آیدی گروه‌ها با منفی شروع می‌شود
+                    rate = self.group_rate if key.startswith("-") else self.chat_rate
+                    lane = self._lanes[key] = _ChatLane(TokenBucket(rate, self.burst))
+        return lane
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            self.throttled += 1
+            time.sleep(seconds)
+
+    def call(self, chat_id, send):
+        """
+        اجرای send() به نوبت چت و با رعایت محدودیت‌ها.
+        send باید پاسخ JSON تلگرام را برگرداند.
+        """
+        lane = self._lane(chat_id)
+        with lane.cond:
+            ticket = lane.next_ticket
+            lane.next_ticket += 1
+            while lane.serving != ticket:
+                lane.cond.wait()
+        try:
+            result = None
+            for attempt in range(self.max_retries + 1):
+                self._sleep(lane.bucket.reserve())
+                self._sleep(self.global_bucket.reserve())
+                result = send()
+                if not result or result.get("error_code") != 429:
+                    return result
+                retry_after = (result.get("parameters") or {}).get("retry_after", 1)
+                print(f"Telegram 429: chat {chat_id}, retry after {retry_after}s")
+                lane.bucket.pause(retry_after)
+                self.retried += 1
+            return result
+        finally:
+            with lane.cond:
+                lane.serving += 1
+                lane.cond.notify_all()
+
+    async def acall(self, chat_id, send):
+        """نسخه async از call؛ send یک coroutine function است و bucketها مشترک‌اند"""
+        import asyncio
+        lane = self._lane(chat_id)
+        if lane.alock is None:
+            lane.alock = asyncio.Lock()
+        async with lane.alock:
+            result = None
+            for attempt in range(self.max_retries + 1):
+                for bucket in (lane.bucket, self.global_bucket):
+                    wait = bucket.reserve()
+                    if wait > 0:
+                        self.throttled += 1
+                        await asyncio.sleep(wait)
+                result = await send()
+                if not result or result.get("error_code") != 429:
+                    return result
+                retry_after = (result.get("parameters") or {}).get("retry_after", 1)
+                print(f"Telegram 429: chat {chat_id}, retry after {retry_after}s")
+                lane.bucket.pause(retry_after)
+                self.retried += 1
+            return result
+
+    def stats(self):
+        return {"chats": len(self._lanes), "throttled": self.throttled, "retried": self.retried}
+
+
+telegram_scheduler = TelegramScheduler()
+
+
+# ─────────────────────────────────────────────────────────────────
+#  ClickUp
+# ─────────────────────────────────────────────────────────────────
+
+def _status_code(error):
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+class ClickUpGovernor:
+    """
+    سهمیه مشترک درخواست‌های ClickUp در این پروسه.
+    - token bucket با سرعت CLICKUP_RATE_PER_MIN؛ بعد از هر پاسخ سرعت طوری تنظیم می‌شود
+      که سهمیه باقی‌مانده (X-RateLimit-Remaining) تا Reset پخش شود
+    - وقتی باقی‌مانده به CLICKUP_RESERVE برسد فقط PRIORITY_HIGH ارسال می‌شود و بقیه
+      تا شروع پنجره بعد صبر می‌کنند
+    - 429: همه درخواست‌ها تا Reset متوقف و درخواست دوباره فرستاده می‌شود
+    """
+
+    def __init__(self, rate_per_min=CLICKUP_RATE_PER_MIN, burst=CLICKUP_BURST, reserve=CLICKUP_RESERVE,
+                 max_retries=CLICKUP_MAX_RETRIES, max_wait=CLICKUP_MAX_WAIT):
+        self.rate = rate_per_min / 60
+        self.bucket = TokenBucket(self.rate, burst)
+        self.reserve = reserve
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.queued = 0
+        self._remaining = None
+        self._reset_at = 0.0
+        self._lock = threading.Lock()
+        self.waits = {PRIORITY_HIGH: 0, PRIORITY_LOW: 0}
+        self.rate_limited = 0
+
+    def _admit(self, priority):
+        """(زمان انتظار، نوبت گرفته شد یا نه)؛ اگر نه بعد از انتظار دوباره بررسی می‌شود"""
+        with self._lock:
+            now = time.time()
+            if self._remaining is not None and now >= self._reset_at:
+                # پنجره جدید: سهمیه کامل و سرعت پایه
+                self._remaining = None
+                self.bucket.rate = self.rate
+            floor = 0 if priority == PRIORITY_HIGH else self.reserve
+            if self._remaining is not None and self._remaining <= floor:
+                return max(0.05, self._reset_at - now), False
+            if self._remaining is not None:
+                self._remaining -= 1
+        return self.bucket.reserve(), True
+
+    def delay(self, priority=PRIORITY_HIGH):
+        """تخمین انتظار فعلی برای سهمیه"""
+        with self._lock:
+            floor = 0 if priority == PRIORITY_HIGH else self.reserve
+            if self._remaining is not None and self._remaining <= floor:
+                return max(0.0, self._reset_at - time.time())
+        return self.bucket.backlog()
+
+    def extension(self, elapsed):
+        """
+        تمدید مهلت دریافت اطلاعات (core.flow.Gather) وقتی درخواستی منتظر سهمیه است:
+        انتظار عمدی برای سهمیه نباید به جای کندی ClickUp حساب شود (سقف max_wait)
+        """
+        if not self.queued or elapsed >= self.max_wait:
+            return 0.0
+        return min(max(1.0, self.delay(PRIORITY_LOW)), self.max_wait - elapsed)
+
+    def _queue(self, delta):
+        with self._lock:
+            self.queued += delta
+
+    def update(self, status_code, headers):
+        """هدرهای X-RateLimit-* هر پاسخ ClickUp"""
+        try:
+            remaining = int(headers.get("x-ratelimit-remaining"))
+            reset_at = float(headers.get("x-ratelimit-reset"))
+        except (TypeError, ValueError):
+            remaining, reset_at = (0, time.time() + 60) if status_code == 429 else (None, None)
+        if remaining is None:
+            return
+        if status_code == 429:
+            remaining = 0
+        with self._lock:
+            now = time.time()
+            self._remaining, self._reset_at = remaining, reset_at
+            # سهمیه باقی‌مانده تا Reset پخش شود (حداقل یک درخواست در ۱۰ ثانیه)
+            self.bucket.rate = max(0.1, remaining / max(1.0, reset_at - now))
+        if remaining <= 0:
+            self.bucket.pause(max(0.0, reset_at - time.time()))
+
+    def _on_error(self, error, attempt):
+        """True اگر درخواست باید دوباره فرستاده شود"""
+        if _status_code(error) != 429 or attempt >= self.max_retries:
+            return False
+        self.rate_limited += 1
+        print(f"ClickUp 429: retry after {self.delay():.0f}s")
+        return True
+
+    def call(self, priority, fetch):
+        """اجرای fetch() در نوبت و با رعایت سهمیه؛ بعد از 429 دوباره تلاش می‌شود"""
+        for attempt in range(self.max_retries + 1):
+            self._queue(1)
+            try:
+                while True:
+                    wait, granted = self._admit(priority)
+                    if wait > 0:
+                        self.waits[priority] += 1
+                        time.sleep(wait)
+                    if granted:
+                        break
+            finally:
+                self._queue(-1)
+            try:
+                return fetch()
+            except Exception as e:
+                if not self._on_error(e, attempt):
+                    raise
+
+    async def acall(self, priority, fetch):
+        """نسخه async از call؛ fetch یک coroutine function است"""
+        import asyncio
+        for attempt in range(self.max_retries + 1):
+            self._queue(1)
+            try:
+                while True:
+                    wait, granted = self._admit(priority)
+                    if wait > 0:
+                        self.waits[priority] += 1
+                        await asyncio.sleep(wait)
+                    if granted:
+                        break
+            finally:
+                self._queue(-1)
+            try:
+                return await fetch()
+            except Exception as e:
+                if not self._on_error(e, attempt):
+                    raise
+
+    def stats(self):
+        return {"remaining": self._remaining, "queued": self.queued, "reset_in": round(max(0.0, self._reset_at - time.time()), 1),
+                "rate_per_min": round(self.bucket.rate * 60, 1), "waits_high": self.waits[PRIORITY_HIGH],
+                "waits_low": self.waits[PRIORITY_LOW], "rate_limited": self.rate_limited}
+
+
+clickup_governor = ClickUpGovernor()
@@ -0,0 +1,225 @@
+"""
+ساخت متن پیام‌های تلگرام
+"""
+
+from .settings import GENERAL
+from .dates import fmt, fmt_day
+from .events import get_username
+
+
+# حداکثر طول متن یک پیام تلگرام (به واحد UTF-16 مثل خود تلگرام)
+TELEGRAM_TEXT_LIMIT = 4096
+
+
+def _tg_len(text):
+    return len(text.encode("utf-16-le")) // 2
+
+def get_task_link(task_id):
+    return f"https://app.clickup.com/t/{task_id}"
+
+def build_comment_message(task_name, task_id, comment_text, username, date, team_config=None, extra_lines=()):
+    """ساخت پیام کامنت جدید"""
+    # ❌ حذف خط تیم طبق درخواست کاربر
+    
+    task_link = get_task_link(task_id)
+    
+    # ✅ بلد کردن عنوان‌ها
+    msg = f"💬 **کامنت جدید**\n\n"
+    # msg += team_line  <-- Removed
+    msg += f"📋 **تسک:** {task_name}\n\n"
+    msg += f"💬 **کامنت:** {comment_text}\n\n"
+    msg += f"👤 **نوشته:** {username}\n\n"
+    msg += f"🕐 **تاریخ:** {fmt(date)}\n\n"
+    
+    # تغییرات دیگر تسک که در همان پنجره ادغام رسیده‌اند
+    for line in extra_lines:
+        msg += f"{line}\n\n"
+    
+    if GENERAL.get("show_task_link", True):
+        msg += f"🔗 [مشاهده تسک]({task_link})"
+    
+    return msg
+
+def build_activity_message(task_name, task_id, team_config=None, title="🔔 **فعالیت جدید**",
+                           lines=(), username=None, date=None):
+    """ساخت پیام فعالیت جدید (تغییر وضعیت، اولویت، ...)"""
+    # ❌ حذف خط تیم طبق درخواست کاربر
+    
+    task_link = get_task_link(task_id)
+    
+    msg = f"{title}\n\n"
+    msg += f"📋 **تسک:** {task_name}\n\n"
+    for line in lines:
+        msg += f"{line}\n\n"
+    if username:
+        msg += f"👤 **توسط:** {username}\n\n"
+    msg += f"🕐 **تاریخ:** {fmt(date)}\n\n"
+    
+    if GENERAL.get("show_task_link", True):
+        msg += f"🔗 [مشاهده تسک]({task_link})"
+    
+    return msg
+
+CHANGE_TITLES = {
+    "status": "📊 **تغییر وضعیت**",
+    "completed": "✅ **تسک تکمیل شد**",
+    "created": "🆕 **تسک جدید**",
+    "priority": "🔥 **تغییر اولویت**",
+    "due_date": "📅 **تغییر ددلاین**",
+    "assignee": "👤 **تغییر مسئول**",
+}
+
+def describe_change(event):
+    """یک خط توضیح تغییر از مقدار قبل/بعد در history_items"""
+    kind, before, after = event["kind"], event["before"], event["after"]
+    if kind in ("status", "completed"):
+        name = lambda s: (s or {}).get("status", "-") if isinstance(s, dict) else (s or "-")
+        return f"🔄 **وضعیت:** {name(before)} → {name(after)}"
+    if kind == "priority":
+        name = lambda p: (p or {}).get("priority", "-") if isinstance(p, dict) else (p or "-")
+        return f"🔥 **اولویت:** {name(before)} → {name(after)}"
+    if kind == "due_date":
+        return f"📅 **ددلاین:** {fmt(after) if after else 'حذف شد'}"
+    if kind == "assignee":
+        if event["field"] == "assignee_rem":
+            return f"👤 **مسئول:** ➖ {get_username(before)}"
+        return f"👤 **مسئول:** ➕ {get_username(after)}"
+    if kind == "created":
+        return "🆕 **تسک ایجاد شد**"
+    if event["field"]:
+        return f"✏️ **تغییر:** {event['field']}"
+    return None
+
+def build_comment_keyboard(team_key, team_config):
+    """دکمه‌های ارسال به تیم (فقط اگر تیم فعال باشد)"""
+    if not (team_key and team_config and team_config.get("enabled")):
+        return None
+    return {
+        "inline_keyboard": [
+            [
+                {"text": "ارسال به تیم 📤", "callback_data": f"send:{team_key}"},
+                {"text": "ادیت و ارسال ✏️", "callback_data": f"edit:{team_key}"}
+            ]
+        ]
+    }
+
+def build_test_message(teams):
+    """پیام تست سرور با لیست تیم‌های فعال"""
+    active_teams = [f"{v['emoji']} {v['name']}" for k, v in teams.items() if v.get('enabled')]
+    teams_list = "\n".join(active_teams) if active_teams else "هیچ تیمی فعال نیست"
+    
+    msg = f"🧪 **تست سرور**\n\n"
+    msg += f"✅ سرور ابری فعال است!\n\n"
+    msg += f"📋 **تیم‌های فعال:**\n{teams_list}\n\n"
+    msg += f"🕐 {fmt(None)}"
+    return msg, len(active_teams)
+
+def _md_escape(text):
+    return "".join("\\" + ch if ch in "_*`[" else ch for ch in text)
+
+def _md_entities(text):
+    """
+    بازه‌های [شروع، پایان) موجودیت‌های Markdown تلگرام با نشانه باز/بسته آن‌ها:
+    ```pre```، `code`، *bold*، _italic_، [متن](url) (نشانه None) و escape با \\
+    (نشانه ""). نشانه بدون جفت موجودیت نیست.
+    """
+    spans, i = [], 0
+    while i < len(text):
+        ch = text[i]
+        end, mark = -1, None
+        if ch == "\\":
+            end, mark = i + 2, ""
+        elif ch == "[":
+            close = text.find("]", i + 1)
+            if close != -1 and text.startswith("(", close + 1):
+                end = text.find(")", close + 2) + 1 or -1
+        elif ch in "*_`":
+            mark = "```" if text.startswith("```", i) else ch
+            end = text.find(mark, i + len(mark))
+            end = end + len(mark) if end != -1 else -1
+        if end == -1:
+            i += 1
+            continue
+        spans.append((i, end, mark))
+        i = end
+    return spans
+
+def _md_inside(spans, pos):
+    """موجودیتی که pos وسط آن است (برش آنجا مجاز نیست)"""
+    return next((s for s in spans if s[0] < pos < s[1]), None)
+
+def _flatten_link(link):
+    """لینک بلندتر از یک پیام → متن و URL ساده (escape شده)"""
+    close = link.index("](")
+    return _md_escape(link[1:close]) + " " + _md_escape(link[close + 2:-1])
+
+def _split_block(block, limit):
+    """
+    تکه کردن یک متن بلندتر از limit - ترجیحا سر خط و فقط بیرون از موجودیت‌های
+    Markdown. موجودیتی که خودش از یک تکه بلندتر است سر مرز بسته و در تکه بعد
+    دوباره باز می‌شود تا تلگرام هیچ تکه‌ای را با 400 رد نکند.
+    """
+    parts = []
+    # جا برای بستن ``` در انتهای تکه
+    budget = limit - 3
+    while _tg_len(block) > limit:
+        cut = budget
+        while _tg_len(block[:cut]) > budget:
+            cut -= max(1, (_tg_len(block[:cut]) - budget) // 2)
+        spans = _md_entities(block)
+        newline = block.rfind("\n", 0, cut)
+        if newline > cut // 2 and not _md_inside(spans, newline):
+            cut = newline
+        span = _md_inside(spans, cut)
+        if span and span[0] > 0:
+            # کل موجودیت به تکه بعد
+            cut = span[0]
+        elif span and span[2] is None:
+            block = _flatten_link(block[:span[1]]) + block[span[1]:]
+            continue
+        elif span:
+            parts.append(block[:cut] + span[2])
+            block = span[2] + block[cut:]
+            continue
+        parts.append(block[:cut].rstrip())
+        block = block[cut:].lstrip()
+    return parts + ([block] if block else [])
+
+def build_digest_messages(team_config, texts, limit=TELEGRAM_TEXT_LIMIT):
+    """خلاصه پیام‌های تایید شده یک تیم → لیست پیام‌ها، هر کدام حداکثر limit"""
+    header = f"🗂 **خلاصه پیام‌ها - {team_config.get('emoji', '')} {team_config.get('name', '')}** ({len(texts)})"
+    separator = "\n\n➖➖➖\n\n"
+    messages, current = [], header
+    for text in texts:
+        for block in _split_block(text, limit - _tg_len(header) - _tg_len(separator)):
+            if _tg_len(current) + _tg_len(separator) + _tg_len(block) > limit:
+                messages.append(current)
+                current = block
+            else:
+                current += separator + block
+    messages.append(current)
+    return messages
+
+REPORT_TITLES = {
+    "daily_report": "📅 **گزارش روزانه**",
+    "weekly_report": "🗓 **گزارش هفتگی**",
+}
+
+def build_report_message(name, first, last, totals, top_tasks, top_users, teams):
+    """گزارش دوره‌ای از شمارنده‌ها: یک خط برای هر تیم + پرکارترین تسک‌ها و کاربران"""
+    period = fmt_day(first) if first == last else f"{fmt_day(first)} تا {fmt_day(last)}"
+    msg = f"{REPORT_TITLES.get(name, '📊 **گزارش**')}\n{period}\n\n"
+    if not totals:
+        return msg + "فعالیتی ثبت نشده است."
+    
+    for key, counts in sorted(totals.items(), key=lambda kv: -sum(kv[1].values())):
+        team = teams.get(key)
+        label = f"{team['emoji']} {team['name']}" if team else "🔸 بدون تیم"
+        msg += (f"{label}\n💬 {counts['comments']}  📊 {counts['status_changes']}"
+                f"  ✅ {counts['completions']}\n\n")
+    
+    if top_tasks:
+        msg += "📋 **پرکارترین تسک‌ها:**\n" + "\n".join(f"• {n} ({c})" for n, c in top_tasks) + "\n\n"
+    if top_users:
+        msg += "👤 **فعال‌ترین افراد:**\n" + "\n".join(f"• {n} ({c})" for n, c in top_users)
+    return msg.rstrip()
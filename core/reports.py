@@ -0,0 +1,241 @@
+"""
+گزارش‌های روزانه / هفتگی (config.REPORTS) از شمارنده‌های تجمعی
+
+هر رویداد پردازش شده شمارنده‌های تیم، تسک و کاربر را برای روز جاری (به وقت
+ایران) یک واحد زیاد می‌کند. تغییرات در حافظه جمع می‌شوند و هر
+REPORT_CHECKPOINT_INTERVAL ثانیه به SQLite اضافه می‌شوند، پس ری‌استارت هفته را
+صفر نمی‌کند و چند worker روی یک فایل جمع می‌شوند. گزارش در زمان تعیین شده با
+چند کوئری GROUP BY روی همین جدول ساخته می‌شود (بدون درخواست به ClickUp) و
+ردیف report_runs جلوی ارسال تکراری توسط workerهای دیگر را می‌گیرد.
+
+CLI:
+    python -m core.reports daily|weekly     # پیش‌نمایش متن گزارش
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from .dates import IRAN_TZ
+
+REPORT_DB = os.getenv("REPORT_DB", "reports.db")
+REPORT_CHECKPOINT_INTERVAL = float(os.getenv("REPORT_CHECKPOINT_INTERVAL", 60))
+REPORT_RETENTION_DAYS = int(os.getenv("REPORT_RETENTION_DAYS", 35))
+REPORT_TOP = int(os.getenv("REPORT_TOP", 5))
+
+METRICS = ("comments", "status_changes", "completions")
+# نوع رویداد (core.events) → شمارنده‌ها
+EVENT_METRICS = {
+    "comment": ("comments",),
+    "status": ("status_changes",),
+    "completed": ("status_changes", "completions"),
+}
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_counts (
+    day TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, scope, key, metric)
+);
+CREATE TABLE IF NOT EXISTS report_names (
+    task_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_runs (
+    report TEXT NOT NULL,
+    period TEXT NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (report, period)
+);
+"""
+
+_ADD = """
+INSERT INTO report_counts (day, scope, key, metric, count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (day, scope, key, metric) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def connect(path=REPORT_DB):
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+class ReportAggregator:
+    """شمارنده‌های روزانه با checkpoint دوره‌ای و زمان‌بند ارسال گزارش"""
+
+    def __init__(self, reports, path=REPORT_DB):
+        self.reports = {name: conf for name, conf in (reports or {}).items() if conf.get("enabled")}
+        self.path = path
+        self.send = None
+        self._deltas = {}
+        self._names = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self.recorded = 0
+        self.sent = 0
+
+    @property
+    def enabled(self):
+        return bool(self.path and self.reports)
+
+    def start(self, send):
+        """send(name, first, last, totals, top_tasks, top_users) برای هر گزارش سررسید شده (فقط در یک پروسه)"""
+        self.send = send
+        if self.enabled:
+            self._ensure_started()
+
+    def _ensure_started(self):
+        # مثل outbox: thread باید در همان worker (بعد از fork) ساخته شود
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._deltas, self._names = {}, {}
+            threading.Thread(target=self._run, name="reports", daemon=True).start()
+            self._pid = os.getpid()
+
+    # ─────────────────────────────────────────────────────────────────
+    #  ثبت
+    # ─────────────────────────────────────────────────────────────────
+
+    def record(self, metric, team_key=None, task_id=None, task_name=None, username=None):
+        if not self.enabled:
+            return
+        self._ensure_started()
+        day = datetime.now(IRAN_TZ).date().isoformat()
+        with self._lock:
+            for scope, key in (("team", team_key or ""), ("task", task_id), ("user", username)):
+                if key is not None:
+                    k = (day, scope, str(key), metric)
+                    self._deltas[k] = self._deltas.get(k, 0) + 1
+            if task_id and task_name:
+                self._names[str(task_id)] = task_name
+            self.recorded += 1
+
+    def checkpoint(self, conn=None):
+        """افزودن تغییرات حافظه به SQLite در یک تراکنش"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+            names, self._names = self._names, {}
+        if not (deltas or names):
+            return
+        conn = conn or connect(self.path)
+        try:
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(_ADD, [(*k, n) for k, n in deltas.items()])
+                conn.executemany("INSERT OR REPLACE INTO report_names VALUES (?, ?)", names.items())
+        except sqlite3.Error as e:
+            print(f"Reports Error: {e}")
+            with self._lock:
+                for k, n in deltas.items():
+                    self._deltas[k] = self._deltas.get(k, 0) + n
+                self._names.update(names)
+
+    # ─────────────────────────────────────────────────────────────────
+    #  زمان‌بند
+    # ─────────────────────────────────────────────────────────────────
+
+    def due(self, now):
+        """گزارش‌های سررسید امروز → [(نام، شناسه دوره، روز اول، روز آخر)]"""
+        today = now.date()
+        result = []
+        for name, conf in self.reports.items():
+            hour, minute = map(int, conf.get("time", "09:00").split(":"))
+            if (now.hour, now.minute) < (hour, minute):
+                continue
+            if name.startswith("weekly"):
+                if WEEKDAYS[today.weekday()] != conf.get("day", "saturday").lower():
+                    continue
+                first = today - timedelta(days=7)
+            else:
+                first = today - timedelta(days=1)
+            result.append((name, today.isoformat(), first, today - timedelta(days=1)))
+        return result
+
+    def claim(self, conn, name, period):
+        """فقط یک پروسه هر گزارش را ارسال می‌کند"""
+        cur = conn.execute("INSERT OR IGNORE INTO report_runs VALUES (?, ?, ?)", (name, period, time.time()))
+        return cur.rowcount == 1
+
+    def unclaim(self, conn, name, period):
+        conn.execute("DELETE FROM report_runs WHERE report = ? AND period = ?", (name, period))
+
+    def totals(self, conn, first, last):
+        """شمارنده‌های بازه: تیم‌ها (همه) و پرکارترین تسک‌ها و کاربران"""
+        span = (first.isoformat(), last.isoformat())
+        teams = {}
+        for key, metric, count in conn.execute(
+                "SELECT key, metric, SUM(count) FROM report_counts WHERE scope = 'team' AND day BETWEEN ? AND ? "
+                "GROUP BY key, metric", span):
+            teams.setdefault(key, dict.fromkeys(METRICS, 0))[metric] = count
+        top = {}
+        for scope in ("task", "user"):
+            top[scope] = conn.execute(
+                "SELECT key, SUM(count) AS n FROM report_counts WHERE scope = ? AND day BETWEEN ? AND ? "
+                "GROUP BY key ORDER BY n DESC LIMIT ?", (scope, *span, REPORT_TOP)).fetchall()
+        names = dict(conn.execute(
+            f"SELECT task_id, name FROM report_names WHERE task_id IN ({','.join('?' * len(top['task']))})",
+            [k for k, _ in top["task"]]).fetchall()) if top["task"] else {}
+        top["task"] = [(names.get(k, k), n) for k, n in top["task"]]
+        return teams, top["task"], top["user"]
+
+    def _tick(self, conn):
+        self.checkpoint(conn)
+        now = datetime.now(IRAN_TZ)
+        for name, period, first, last in self.due(now):
+            if not self.claim(conn, name, period):
+                continue
+            try:
+                self.send(name, first, last, *self.totals(conn, first, last))
+                self.sent += 1
+            except Exception as e:
+                # دفعه بعد دوباره تلاش شود
+                print(f"Report Error: {name} {e}")
+                self.unclaim(conn, name, period)
+        conn.execute("DELETE FROM report_counts WHERE day < ?",
+                     ((now.date() - timedelta(days=REPORT_RETENTION_DAYS)).isoformat(),))
+
+    def _run(self):
+        conn = connect(self.path)
+        while True:
+            time.sleep(REPORT_CHECKPOINT_INTERVAL)
+            try:
+                self._tick(conn)
+            except Exception as e:
+                print(f"Reports Error: {e}")
+
+    def close(self):
+        """checkpoint نهایی (هنگام خاموش شدن)"""
+        if self._pid == os.getpid():
+            self.checkpoint()
+
+    def stats(self):
+        return {"reports": sorted(self.reports), "recorded": self.recorded, "pending": len(self._deltas),
+                "sent": self.sent}
+
+
+def main(argv):
+    from .settings import TEAMS, REPORTS
+    from .render import build_report_message
+    name = f"{argv[0] if argv else 'daily'}_report"
+    aggregator = ReportAggregator({name: {**REPORTS.get(name, {}), "enabled": True}})
+    today = datetime.now(IRAN_TZ).date()
+    first = today - timedelta(days=7 if name.startswith("weekly") else 1)
+    print(build_report_message(name, first, today - timedelta(days=1),
+                               *aggregator.totals(connect(REPORT_DB), first, today - timedelta(days=1)), TEAMS))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,88 @@
+"""
+ایندکس مسیریابی تیم: (field id, گزینه dropdown) → تیم
+
+ایندکس یک بار از TEAMS و تعریف فیلدهای custom ساخته می‌شود. هر مقدار ایندکس
+جای گزینه در لیست و id / نام / orderindex آن را هم نگه می‌دارد؛ در هر رویداد فقط
+همان گزینه انتخاب شده در همان جا مقایسه می‌شود (O(1)) و اگر فرق داشت (جابه‌جایی یا
+تغییر نام گزینه‌ها، یا مقدار ناشناخته) ایندکس همان فیلد دوباره ساخته می‌شود.
+"""
+
+import threading
+
+
+class TeamRouter:
+    """تشخیص تیم از فیلد custom تسک با lookup مستقیم"""
+
+    def __init__(self, teams, field_name="requestor"):
+        self.teams = teams
+        self.field_name = field_name.lower()
+        # field_id → None (فیلد تیم نیست) یا {orderindex/uuid: (جای گزینه، شناسه گزینه، team_key)}
+        self._fields = {}
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+
+    def _match_team(self, option_name):
+        option_name = option_name.lower()
+        for team_key in self.teams:
+            if team_key in option_name or option_name in team_key:
+                return team_key
+        return None
+
+    @staticmethod
+    def _identity(opt):
+        return opt.get('id'), opt.get('name'), opt.get('orderindex')
+
+    def _build(self, field):
+        mapping = {}
+        for pos, opt in enumerate(field.get('type_config', {}).get('options', [])):
+            # گزینه‌های بدون تیم هم ثبت می‌شوند (None) تا باعث ساخت دوباره نشوند
+            entry = (pos, self._identity(opt), self._match_team(opt.get('name', '')))
+            if opt.get('orderindex') is not None:
+                mapping[opt['orderindex']] = entry
+            if opt.get('id'):
+                mapping[opt['id']] = entry
+        self.rebuilds += 1
+        return mapping
+
+    def _fresh(self, options, entry):
+        """گزینه ایندکس شده هنوز در همان جا با همان id / نام / orderindex است؟"""
+        pos, identity, _ = entry
+        return pos < len(options) and self._identity(options[pos]) == identity
+
+    def _entry(self, field):
+        field_id = field.get('id')
+        if field_id not in self._fields:
+            with self._lock:
+                if field_id not in self._fields:
+                    is_team_field = self.field_name in field.get('name', '').lower()
+                    self._fields[field_id] = self._build(field) if is_team_field else None
+        return self._fields[field_id]
+
+    def resolve(self, task_data):
+        """(team_key, team_config) یا (None, None)"""
+        if not task_data:
+            return None, None
+
+        for field in task_data.get('custom_fields', []):
+            mapping = self._entry(field)
+            if mapping is None:
+                continue
+            value = field.get('value')
+            if value is None:
+                continue
+            # فیلد labels لیستی از uuid است، dropdown یک orderindex
+            values = value if isinstance(value, list) else [value]
+
+            options = field.get('type_config', {}).get('options', [])
+            if not all(v in mapping and self._fresh(options, mapping[v]) for v in values):
+                # تعریف فیلد تغییر کرده (یا گزینه ناشناخته) → ساخت دوباره فقط همین فیلد
+                mapping = self._build(field)
+                with self._lock:
+                    self._fields[field.get('id')] = mapping
+
+            for v in values:
+                team_key = mapping[v][2] if v in mapping else None
+                if team_key is not None:
+                    return team_key, self.teams[team_key]
+
+        return None, None
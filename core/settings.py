@@ -0,0 +1,44 @@
+"""
+تنظیمات مشترک: config.py + متغیرهای محیطی
+"""
+
+import os
+
+# ─────────────────────────────────────────────────────────────────────────────────
+#  📋 تنظیمات از فایل config.py
+# ─────────────────────────────────────────────────────────────────────────────────
+try:
+    from config import TEAMS, NOTIFICATIONS, GENERAL
+except ImportError:
+    # تنظیمات پیش‌فرض اگر فایل config نبود
+    TEAMS = {
+        "facility": {
+            "chat_id": "-1002914241474",
+            "name": "Facility & Partnership",
+            "emoji": "🏢",
+            "enabled": True,
+        }
+    }
+    NOTIFICATIONS = {
+        "comment_added": True,
+        "status_changed": True,
+        "task_completed": True,
+        "task_created": True,
+    }
+    GENERAL = {
+        "default_chat_id": "918656204",
+        "also_send_to_default": True,
+        "show_task_link": True,
+        "team_field_name": "requestor",
+    }
+
+try:
+    from config import REPORTS
+except ImportError:
+    REPORTS = {}
+
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID") or GENERAL.get("default_chat_id")
+CLICKUP_API_TOKEN = os.getenv("CLICKUP_API_TOKEN")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+TEST_KEY = os.getenv("TEST_KEY", "clickup2025")
@@ -0,0 +1,96 @@
+"""
+Single-flight برای درخواست‌های ClickUp
+
+وقتی چند رویداد یک تسک هم‌زمان پردازش می‌شوند، همه همان GET /task/{id} یا
+/task/{id}/comment را می‌خواهند. اولین درخواست واقعا فرستاده می‌شود و بقیه تا
+رسیدن پاسخ منتظر می‌مانند و همان نتیجه (یا خطا) را می‌گیرند. threadها (run) و
+event loop (arun) هر کدام جدول جدا دارند.
+
+نتیجه بین فراخوانی‌ها مشترک است و نباید تغییر داده شود (مثل task_cache).
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        """fn() یک بار برای همه فراخوانی‌های هم‌زمان با همین key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.event.set()
+        else:
+            call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def ado(self, key, fn):
+        """نسخه async از do؛ fn یک coroutine function است"""
+        import asyncio
+        while True:
+            future = self._futures.get(key)
+            if future is None:
+                break
+            self.shared += 1
+            try:
+                # shield: لغو یکی از منتظرها درخواست مشترک را لغو نمی‌کند
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # درخواست اصلی لغو شد (نه این task) → این بار خودش می‌فرستد
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                self.shared -= 1
+
+        future = self._futures[key] = asyncio.get_running_loop().create_future()
+        self.calls += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # اگر منتظری نبود خطای future بدون مصرف نماند
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[key]
+
+    def stats(self):
+        total = self.calls + self.shared
+        return {"calls": self.calls, "shared": self.shared,
+                "saved_ratio": round(self.shared / total, 3) if total else 0.0}
+
+
+clickup_flight = SingleFlight()
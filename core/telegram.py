@@ -0,0 +1,201 @@
+"""
+ارسال پیام به تلگرام (Bot API)
+"""
+
+from .settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from .cache import album_cache
+from .outbox import outbox, OUTBOX_BACKOFF_BASE
+from .media import file_ids as file_id_cache, Attachment
+from .flow import Telegram, blocking
+
+
+# خطاهای 400 که یعنی تلگرام خود فایل (URL یا file_id) را نتوانست پیدا کند (نه خطای متن / پارامترها)
+URL_FETCH_ERRORS = ("wrong file identifier/http url specified", "failed to get http url content",
+                    "wrong type of the web page content", "wrong remote file identifier")
+
+def url_fetch_failed(result):
+    description = (result.get('description') or '').lower()
+    return result.get('error_code') == 400 and any(e in description for e in URL_FETCH_ERRORS)
+
+def call(method, params, files=None):
+    """فراخوانی Bot API → پاسخ تلگرام؛ خطای شبکه به شکل پاسخ ناموفق با transient"""
+    try:
+        result = yield Telegram(method, params, files)
+    except Exception as e:
+        print(f"Telegram Error: {e}")
+        return {"ok": False, "description": str(e), "transient": True}
+    if not result.get("ok"):
+        print(f"Telegram Error: {result.get('error_code') or 0} {result.get('description')}")
+    return result
+
+def is_transient(result):
+    """خطای موقت (شبکه، 429، 5xx) که ارسال دوباره همان درخواست ممکن است موفق شود"""
+    error_code = result.get('error_code') or 0
+    return bool(result.get("transient")) or error_code == 429 or error_code >= 500
+
+@blocking
+def make_request(method, params, durable=False):
+    """
+    فراخوانی Bot API (پیام‌های هر چت به نوبت و با رعایت محدودیت تلگرام).
+    durable: اگر ارسال به خاطر خطای موقت (شبکه، 429، 5xx) شکست بخورد، در outbox ذخیره
+    می‌شود تا بعدا دوباره ارسال شود.
+    """
+    if not TELEGRAM_BOT_TOKEN: return None
+    result = yield from call(method, params)
+    if not result.get("ok"):
+        if durable and is_transient(result): save_for_retry(method, params)
+        return None
+    return result
+
+def save_for_retry(method, params):
+    outbox.add("message", {"method": method, "params": params}, delay=OUTBOX_BACKOFF_BASE, held=False)
+
+def inline_request(method, params):
+    """
+    فراخوانی Bot API در بدنه پاسخ webhook تلگرام - بدون درخواست خروجی.
+    تلگرام نتیجه را برنمی‌گرداند، پس فقط برای فراخوانی‌هایی که نتیجه‌شان لازم نیست.
+    """
+    return {"method": method, **params}
+
+def message_params(text, chat_id, reply_markup=None):
+    params = {
+        'chat_id': chat_id,
+        'text': text,
+        'parse_mode': 'Markdown'
+    }
+    if reply_markup:
+        params['reply_markup'] = reply_markup
+    return params
+
+def callback_query_params(callback_query_id, text=None):
+    params = {'callback_query_id': callback_query_id}
+    if text: params['text'] = text
+    return params
+
+@blocking
+def send_telegram(text, chat_id=None, reply_markup=None, durable=False):
+    target_chat = chat_id or TELEGRAM_CHAT_ID
+    if not target_chat: return False
+    params = message_params(text, target_chat, reply_markup)
+    return (yield from make_request.flow("sendMessage", params, durable)) is not None
+
+@blocking
+def send_media(method, build, photos, durable=False):
+    """
+    sendPhoto / sendMediaGroup با عکس‌هایی که ممکن است پیوست ClickUp (Attachment) باشند.
+    build(refs) پارامترها را با مرجع هر عکس می‌سازد: file_id ذخیره شده، وگرنه URL؛ اگر
+    تلگرام file_id ذخیره شده را قبول نکند از کش حذف و یک بار دیگر با URL فرستاده می‌شود؛
+    اگر URL را دریافت نکند پیوست‌ها از ClickUp جریانی آپلود می‌شوند (خطاهای دیگر مثل
+    Markdown نامعتبر با آپلود هم تکرار می‌شوند، پس دانلود نمی‌شوند). بعد از ارسال موفق
+    file_id پیوست‌ها در core.media ذخیره می‌شود.
+    """
+    if not TELEGRAM_BOT_TOKEN: return None
+    refs = [file_id_cache.resolve(p) for p in photos]
+    result = yield from call(method, build(refs))
+    stale = [i for i, (p, ref) in enumerate(zip(photos, refs)) if isinstance(p, Attachment) and ref != p.url]
+    if not result.get("ok") and url_fetch_failed(result) and stale:
+        # تلگرام نمی‌گوید کدام عکس آلبوم → همه file_idهای این درخواست دوباره از URL
+        for i in stale:
+            file_id_cache.forget(photos[i].id)
+            refs[i] = photos[i].url
+        result = yield from call(method, build(refs))
+    if not result.get("ok") and url_fetch_failed(result):
+        files = {f"file{i}": (p.name, p.url) for i, (p, ref) in enumerate(zip(photos, refs))
+                 if isinstance(p, Attachment) and ref == p.url}
+        if files:
+            file_id_cache.uploads += len(files)
+            upload_refs = [f"attach://file{i}" if f"file{i}" in files else ref for i, ref in enumerate(refs)]
+            result = yield from call(method, build(upload_refs), files)
+            # آپلود در outbox ذخیره نمی‌شود (فایل‌ها در پارامترها نیستند)
+            durable = False
+    if not result.get("ok"):
+        if durable and is_transient(result): save_for_retry(method, build(refs))
+        return None
+    messages = result["result"] if isinstance(result["result"], list) else [result["result"]]
+    file_id_cache.remember(photos, messages)
+    return result
+
+@blocking
+def send_photo(photo, caption, chat_id=None, reply_markup=None, durable=False):
+    """photo: پیوست ClickUp (Attachment)، URL یا file_id"""
+    target_chat = chat_id or TELEGRAM_CHAT_ID
+    if not target_chat: return False
+    params = {
+        'chat_id': target_chat,
+        'caption': caption,
+        'parse_mode': 'Markdown'
+    }
+    if reply_markup:
+        params['reply_markup'] = reply_markup
+    return (yield from send_media.flow("sendPhoto", lambda refs: {**params, 'photo': refs[0]}, [photo], durable)) is not None
+
+@blocking
+def send_media_group(photos, caption, chat_id=None, durable=False):
+    """ارسال چند عکس به صورت آلبوم (هر درخواست حداکثر ۱۰ عکس) - لیست پیام‌های ارسال شده"""
+    target_chat = chat_id or TELEGRAM_CHAT_ID
+    if not target_chat: return []
+    messages = []
+    for i in range(0, len(photos), 10):
+        chunk = photos[i:i+10]
+        first_caption = caption if i == 0 else None
+        if len(chunk) == 1:
+            # آلبوم حداقل ۲ عکس لازم دارد
+            params = {'chat_id': target_chat}
+            if first_caption:
+                params.update({'caption': first_caption, 'parse_mode': 'Markdown'})
+            result = yield from send_media.flow("sendPhoto", lambda refs: {**params, 'photo': refs[0]}, chunk, durable)
+            if result: messages.append(result["result"])
+            continue
+        result = yield from send_media.flow("sendMediaGroup", lambda refs: {
+            'chat_id': target_chat, 'media': _album_media(refs, first_caption)}, chunk, durable)
+        if result: messages.extend(result["result"])
+    return messages
+
+def _album_media(refs, caption):
+    media = [{'type': 'photo', 'media': ref} for ref in refs]
+    if caption:
+        media[0].update({'caption': caption, 'parse_mode': 'Markdown'})
+    return media
+
+@blocking
+def send_album(photo_urls, caption, chat_id=None, reply_markup=None, durable=False):
+    """ارسال آلبوم به ادمین + یک پیام کنترلی با دکمه‌ها (پاسخ به اولین عکس آلبوم)"""
+    messages = yield from send_media_group.flow(photo_urls, caption, chat_id, durable)
+    if not messages: return False
+    
+    first = messages[0]
+    if first.get("media_group_id"):
+        file_ids = [m["photo"][-1]["file_id"] for m in messages if m.get("photo")]
+        album_cache.set(f"{first['chat']['id']}:{first['media_group_id']}", (file_ids, caption))
+    
+    if reply_markup:
+        yield from make_request.flow("sendMessage", {
+            'chat_id': first['chat']['id'],
+            'text': f"🖼 {len(messages)} تصویر",
+            'reply_to_message_id': first['message_id'],
+            'reply_markup': reply_markup,
+        })
+    return True
+
+@blocking
+def forward_album(album_message, chat_id):
+    """ارسال دوباره کل آلبوم با file_id در یک درخواست"""
+    key = f"{album_message['chat']['id']}:{album_message['media_group_id']}"
+    cached = album_cache.get(key)
+    if cached:
+        file_ids, caption = cached
+    else:
+        # آلبوم در کش نیست (مثلا ری‌استارت) → فقط همان عکسی که به آن پاسخ داده شده
+        file_ids = [album_message["photo"][-1]["file_id"]]
+        caption = album_message.get("caption")
+    return len((yield from send_media_group.flow(file_ids, caption, chat_id))) > 0
+
+@blocking
+def edit_message_reply_markup(chat_id, message_id, reply_markup=None):
+    params = {
+        'chat_id': chat_id,
+        'message_id': message_id
+    }
+    if reply_markup:
+        params['reply_markup'] = reply_markup
+    return (yield from make_request.flow("editMessageReplyMarkup", params))
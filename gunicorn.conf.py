@@ -0,0 +1,10 @@
+# تنظیمات gunicorn - این فایل به‌طور خودکار از پوشه جاری خوانده می‌شود
+
+# زمان کافی برای خالی شدن صف تحویل قبل از kill شدن worker
+graceful_timeout = 30
+
+
+def worker_exit(server, worker):
+    # پنجره ادغام و خلاصه تیم‌ها → صف تحویل → commit نهایی outbox و گزارش‌ها
+    from core.pipeline import shutdown
+    shutdown()